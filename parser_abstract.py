@@ -4,134 +4,116 @@
 Идет по страницам, парсит года, заголовки, затем переходит на страницу с аннотацией.
 """
 
-import time
-import json
+import asyncio
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import httpx
+from lxml import etree
 
-import parser_web
-from parser_hse import load_or_build_faculty_dict
+from parser_hse import (BASE_URL, MAX_CONCURRENCY, load_or_build_faculty_dict, make_client, run_limited,
+                        fetch_tree, fetch_works, work_key, load_done, take_new, write_json, SWEEP_WORKERS)
+from parser_web import text_of
 from pathlib import Path
 
+# Тут будут json
+OUT = Path("abstract")
 
-def main(year, faculty_code):
+# Блок с аннотацией по full Xpath
+XP_ANNOTATION = etree.XPath("/html/body/div/div[4]/div/div[2]/div/div[1]/div/div[1]/div/div")
+
+
+async def process_work(client: httpx.AsyncClient, work: dict):
     """
-    Основной код парсера. Итерируемся по страницам и переходим на каждую работу.
+    Переходим на страницу работы, забираем аннотацию и сохраняем её.
+
+    :param client: Http-клиент.
+    :param work: Словарь с нужными компонентами.
+    """
+    print(f"— {work['title']} | {work['work_year']} | {work['faculty_name']} -> {work['faculty_code']}")
+
+    fnj = OUT / f"{work_key(work)}.json"
+
+    # Множество done у каждого процесса обхода своё (при --all), и одну работу может забрать
+    # параллельный обход другого факультета - проверяем, не сохранена ли она уже
+    if fnj.exists():
+        print(f"[✓] Уже обработан: {fnj.name}")
+        return
+
+    try:
+        tree = await fetch_tree(client, work["detail_url"])
+        ann_el = XP_ANNOTATION(tree)[0]
+        annotation = text_of(ann_el)
+        print(f"Аннотация ({len(annotation)} знаков): {annotation[:100]}…")
+    except Exception as e:
+        print(f" Аннотация не найдена или ошибка парсинга: {e} — пропускаем.")
+        return
+
+    # Для удобства распакуем здесь
+    title = work['title']
+    year = work['work_year']
+    topic = work['faculty_name']
+    code = work['faculty_code']
+
+    result = {
+        'заголовок': title,
+        'год': year,
+        'тема': topic,
+        'код_темы': code,
+        'аннотация': annotation
+    }
+    write_json(fnj, result)
+
+
+async def crawl(year, faculty_code):
+    """
+    Итерируемся по страницам списка и параллельно забираем аннотации работ со страницы.
 
     :param year: Год, в котором происходила защита работ.
     :param faculty_code: Факультет, на котором происходила защита работ.
     """
-    # основная ссылка без параметров
-    base_url = "https://www.hse.ru/edu/vkr/"
+    faculty_dict = load_or_build_faculty_dict(BASE_URL, year)
+    print("Факультеты:", faculty_dict)
 
-    # настраиваем driver
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    driver = webdriver.Chrome(options=chrome_options)
+    OUT.mkdir(exist_ok=True)
+    done = load_done(OUT)
 
-    try:
-        faculty_dict = load_or_build_faculty_dict(driver, base_url, year)
-        print("Факультеты:", faculty_dict)
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
 
+    async with make_client() as client:
         page = 1
         while True:
-            # Добавляем параметры. Обязательно наличие текста, язык работ - русский.
-            url = (
-                f"{base_url}"
-                f"?faculty={faculty_code}"
-                f"&year={year}"
-                f"&language=ru"
-                f"&text_available=yes"
-                f"&page={page}"
-            )
-            driver.get(url)
-            # ждём, пока хотя бы одно вхождение карточки появится (или таймаут)
             try:
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "ul.vkr-list li.vkr-card"))
-                )
-            except:
-                print(f"Страница {page}: карточек не найдено -> завершаем.")
+                works = await fetch_works(client, year, faculty_code, page, faculty_dict)
+            except httpx.HTTPError as e:
+                print(f"Страница {page}: ошибка загрузки ({e}) -> завершаем.")
                 break
 
-            cards = driver.find_elements(By.CSS_SELECTOR, "ul.vkr-list li.vkr-card")
-            if not cards:
-                print(f"Страница {page}: пусто -> завершаем.")
+            if not works:
+                print(f"Страница {page}: карточек не найдено -> завершаем.")
                 break
 
-            print(f"Страница {page} -> найдено {len(cards)} работ")
-
-            # Собираем базовые данные без WebElement
-            works = []
-            for card in cards:
-                title_el = card.find_element(By.CSS_SELECTOR, "h3.vkr-card__title a")
-                title = title_el.text.strip()
-
-                detail_url = title_el.get_attribute("href")
-                year_el = card.find_element(By.XPATH, ".//p[contains(., 'Год защиты')]/span")
-
-                work_year = year_el.text.strip()
-
-                faculty_name = card.find_element(By.CSS_SELECTOR, "p.vkr-card__item a.link").text.strip()
-                faculty_code_parsed = faculty_dict.get(faculty_name, "UNKNOWN")
-
-                works.append({
-                    "title": title,
-                    "detail_url": detail_url,
-                    "work_year": work_year,
-                    "faculty_name": faculty_name,
-                    "faculty_code": faculty_code_parsed
-                })
-
-            for work in works:
-                print(f"— {work['title']} | {work['work_year']} | {work['faculty_name']} -> {work['faculty_code']}")
-                driver.get(work["detail_url"])
-                time.sleep(1)
-
-                try:
-                    # Находим блок с аннотацией по full Xpath
-                    ann_el = driver.find_element(By.XPATH,
-                                                 "/html/body/div/div[4]/div/div[2]/div/div[1]/div/div[1]/div/div")
-                    annotation = ann_el.text.strip()
-                    print(f"Аннотация ({len(annotation)} знаков): {annotation[:100]}…")
-                except Exception as e:
-                    print(f" Аннотация не найдена или ошибка парсинга: {e} — пропускаем.")
-                    continue
-
-                # Для удобства распакуем здесь
-                title = work['title']
-                year = work['work_year']
-                topic = work['faculty_name']
-                code = work['faculty_code']
-
-                # Тут будут json
-                OUT = Path("abstract")
-                fnj = OUT / f"{parser_web.get_md5_hash(title + year)}.json"
-
-                result = {
-                    'заголовок': title,
-                    'год': year,
-                    'тема': topic,
-                    'код_темы': code,
-                    'аннотация': annotation
-                }
-                if not fnj.exists():
-                    with open(fnj, 'w', encoding='utf-8') as f:
-                        json.dump(result, f, ensure_ascii=False, indent=2)
+            # Уже сохранённые аннотации не загружаем повторно
+            todo = take_new(works, done)
+            print(f"Страница {page} -> найдено {len(works)} работ, из них новых {len(todo)}")
+
+            tasks = [asyncio.create_task(run_limited(sem, process_work(client, work))) for work in todo]
+            await asyncio.gather(*tasks)
 
             page += 1
-            time.sleep(1)
+            await asyncio.sleep(1)
+
+    print("Парсинг завершён.")
+
 
-        print("Парсинг завершён.")
+def main(year, faculty_code):
+    """
+    Основной код парсера. Итерируемся по страницам и переходим на каждую работу.
 
-    finally:
-        driver.quit()
+    :param year: Год, в котором происходила защита работ.
+    :param faculty_code: Факультет, на котором происходила защита работ.
+    """
+    asyncio.run(crawl(year, faculty_code))
 
 
 PARSE_YEARS = list(range(2022, 2012, -1))
@@ -188,17 +170,48 @@ PARSE_CODE = [
     "1030791"     # Высшая школа юриспруденции и администрирования
 ]
 
-# Итерируемся по всем годам и факультетам
-# for code in PARSE_CODE:
-#     for year in PARSE_YEARS:
-#         print('* ' * 10 + str(code) + '  ' + str(year) + ' *' * 10)
-#         main(year, code)
-#     print('*' * 10)
+
+def parse_faculty(code):
+    """
+    Обходим все годы одного факультета.
+
+    :param code: Код факультета.
+    """
+    for year in PARSE_YEARS:
+        print('* ' * 10 + str(code) + '  ' + str(year) + ' *' * 10)
+        main(year, code)
+    print('*' * 10)
+
+
+def parse_all(workers: int = SWEEP_WORKERS):
+    """
+    Итерируемся по всем годам и факультетам, факультеты обходятся параллельно в отдельных процессах.
+
+    :param workers: Сколько факультетов обходим одновременно.
+    """
+    # Словарь факультетов строим один раз здесь, процессы дальше читают готовый кеш
+    load_or_build_faculty_dict(BASE_URL, PARSE_YEARS[0])
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(parse_faculty, code) for code in PARSE_CODE]
+        for code, future in zip(PARSE_CODE, futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Факультет {code}: обход прерван ({e})")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Парсер дипломных работ НИУ ВШЭ")
-    parser.add_argument("--year", required=True, help="Год защиты (например, 2021)")
-    parser.add_argument("--faculty", required=True, help="Код факультета (из словаря)")
+    parser.add_argument("--year", help="Год защиты (например, 2021)")
+    parser.add_argument("--faculty", help="Код факультета (из словаря)")
+    parser.add_argument("--all", action="store_true", help="Обойти все годы PARSE_YEARS и факультеты PARSE_CODE")
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS,
+                        help="Сколько факультетов обходить одновременно при --all")
     args = parser.parse_args()
-    main(args.year, args.faculty)
+    if args.all:
+        parse_all(args.workers)
+    elif args.year and args.faculty:
+        main(args.year, args.faculty)
+    else:
+        parser.error("нужны --year и --faculty либо --all")
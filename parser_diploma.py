@@ -5,27 +5,58 @@
 import fitz
 import re
 import sys
+import numpy as np
 
+# Год защиты 20xx
+RE_YEAR = re.compile(r"\b20\d{2}\b")
 
-def extract_title_and_year(pdf_path):
+# Флаги извлечения текста: как у get_text("dict"), но без содержимого картинок
+TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+
+def extract_title_and_year(pdf):
+    """
+    Извлекаем первую страницу диплома и возвращаем тему (заголовок) и год.
+    pdf можно передать как путь или уже прочитанным содержимым (bytes), например после скачивания.
+
+    :param pdf: Путь к pdf или его содержимое.
+    :return: Заголовок диплома и год защиты.
     """
-    Извлекаем первую страницу диплома и возвращаем тему (заголовок) и год. Как правило, год в самом низу страницы.
+    if isinstance(pdf, (bytes, bytearray)):
+        doc = fitz.open(stream=pdf, filetype="pdf")
+    else:
+        doc = fitz.open(pdf)
+
+    with doc:
+        return extract_from_doc(doc)
+
+
+def extract_from_doc(doc):
+    """
+    Как правило, год в самом низу титульной страницы.
     Заголовок же - самый большой центрированный по размеру шрифта блок.
 
-    :param pdf_path: Путь к pdf.
+    :param doc: Открытый pdf документ.
     :return: Заголовок диплома и год защиты.
     """
-    doc = fitz.open(pdf_path)
     if doc.page_count == 0:
         return None, None
 
     page = doc[0]
     W, H = page.rect.width, page.rect.height
-    data = page.get_text("dict")
+    # Разбор страницы (TextPage) делаем один раз; картинки в словарь не попадают
+    tp = page.get_textpage(flags=TEXT_FLAGS)
+    data = tp.extractDICT()
 
-    # Собираем все текстовые спаны, ищем max_size
-    candidates = []
+    # За один проход держим только кандидатов в заголовок (спаны с текущим максимальным шрифтом)
     max_size = 0.0
+    texts, sizes, x0, y0, x1 = [], [], [], [], []
+    # Год ищем в каждом спане по ходу того же прохода:
+    # первый год внизу страницы (y1 ≥ 80% высоты) и первый год вообще (запасной вариант)
+    # (не через extractBLOCKS: у блока другой y1 и склеенные строки, год находился бы не там,
+    # а словарь всё равно уже разобран - отдельный проход по блокам только добавил бы работы)
+    bottom = H * 0.8
+    bottom_year = any_year = None
 
     for b in data["blocks"]:
         if b.get("type") != 0:
@@ -35,84 +66,67 @@ def extract_title_and_year(pdf_path):
                 txt = span["text"].strip()
                 if not txt:
                     continue
-                size = span["size"]
                 bbox = span["bbox"]  # [x0, y0, x1, y1]
-                candidates.append({
-                    "text": txt,
-                    "size": size,
-                    "bbox": bbox
-                })
+                size = span["size"]
+
+                if bottom_year is None and (any_year is None or bbox[3] >= bottom):
+                    m = RE_YEAR.search(txt)
+                    if m:
+                        if any_year is None:
+                            any_year = m.group()
+                        if bbox[3] >= bottom:
+                            bottom_year = m.group()
+
+                # Нашли шрифт крупнее - оставляем только тех, кто с ним совпадает
                 if size > max_size:
                     max_size = size
+                    keep = [i for i, s in enumerate(sizes) if max_size - s < 1e-3]
+                    if len(keep) < len(sizes):
+                        texts, sizes, x0, y0, x1 = ([a[i] for i in keep] for a in (texts, sizes, x0, y0, x1))
+                if max_size - size < 1e-3:
+                    texts.append(txt)
+                    sizes.append(size)
+                    x0.append(bbox[0])
+                    y0.append(bbox[1])
+                    x1.append(bbox[2])
+
+    if not texts:
+        return None, None
 
-    # Отбираем все спаны с размером примерно max_size
-    title_spans = [
-        c for c in candidates
-        if abs(c["size"] - max_size) < 1e-3
-    ]
+    x0, y0, x1 = (np.asarray(a, dtype=np.float64) for a in (x0, y0, x1))
 
     # Фильтруем по горизонтальной центрированности
-    center_tol = W * 0.1
-    title_spans = [
-        c for c in title_spans
-        if abs((c["bbox"][0] + c["bbox"][2]) / 2 - W/2) <= center_tol
-    ]
+    title_idx = np.flatnonzero(np.abs((x0 + x1) / 2 - W / 2) <= W * 0.1)
 
     # Если не нашли ни одного центрированного, пробуем взять все с max_size
-    if not title_spans:
-        title_spans = [
-            c for c in candidates
-            if abs(c["size"] - max_size) < 1e-3
-        ]
-
-    title = None
-    if title_spans:
-        # Сортируем по y0 (вертикаль), затем x0 (горизонталь)
-        spans = sorted(title_spans, key=lambda c: (c["bbox"][1], c["bbox"][0]))
-        # Группируем в строки по близости y0
-        lines = []
-        line_tol = max_size * 0.5  # допускаем половину размера шрифта
-        current = [spans[0]]
-        for prev, cur in zip(spans, spans[1:]):
-            if abs(cur["bbox"][1] - prev["bbox"][1]) <= line_tol:
-                current.append(cur)
-            else:
-                lines.append(current)
-                current = [cur]
-        lines.append(current)
-
-        # В каждой строке сортируем по x0 и соединяем через пробел
-        parts = []
-        for ln in lines:
-            ln_sorted = sorted(ln, key=lambda c: c["bbox"][0])
-            parts.append(" ".join(c["text"] for c in ln_sorted))
-
-        # Собираем финальный заголовок
-        title = " ".join(parts)
-
-    # Теперь ищем год 20xx — сначала внизу страницы
-    year = None
-    for c in candidates:
-        if c["bbox"][3] >= H * 0.8:  # y1 ≥ 80% высоты
-            m = re.search(r"\b20\d{2}\b", c["text"])
-            if m:
-                year = m.group()
-                break
-
-    # Если не нашли внизу — ищем по всему тексту
-    if not year:
-        for c in candidates:
-            m = re.search(r"\b20\d{2}\b", c["text"])
-            if m:
-                year = m.group()
-                break
+    if not title_idx.size:
+        title_idx = np.arange(len(texts))
+
+    # Сортируем по y0 (вертикаль), затем x0 (горизонталь)
+    order = title_idx[np.lexsort((x0[title_idx], y0[title_idx]))]
+
+    # Группируем в строки по близости y0, допускаем половину размера шрифта
+    line_tol = max_size * 0.5
+    breaks = np.flatnonzero(np.diff(y0[order]) > line_tol) + 1
+
+    # В каждой строке сортируем по x0 и соединяем через пробел
+    parts = []
+    for ln in np.split(order, breaks):
+        ln_sorted = ln[np.argsort(x0[ln], kind="stable")]
+        parts.append(" ".join(texts[i] for i in ln_sorted))
+
+    # Собираем финальный заголовок
+    title = " ".join(parts)
+
+    # Сначала год внизу страницы, если не нашли внизу — первый по всему тексту
+    year = bottom_year or any_year
 
     return title, year
 
 
 def main():
     if len(sys.argv) != 2:
-        print("Использование: python extract_title_year.py <путь_к_pdf>")
+        print("Использование: python parser_diploma.py <путь_к_pdf>")
         sys.exit(1)
 
     pdf_path = sys.argv[1]
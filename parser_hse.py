@@ -6,86 +6,216 @@
 
 import os
 import re
-import time
-import json
+import random
+import asyncio
 import argparse
-import requests
 import subprocess
+import contextlib
 from pathlib import Path
+from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor
 import traceback
 
+import httpx
+import orjson
+import lxml.html
+from lxml import etree
+from lxml.cssselect import CSSSelector
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import parser_web
 import parser_pdf
+from parser_web import text_of
 
 OUT = Path("downloads-hse")
 
+# основная ссылка без параметров
+BASE_URL = "https://www.hse.ru/edu/vkr/"
+# Общий для всех лет кеш словаря факультетов: название -> id
+FACULTY_CACHE = Path("faculty_dict.json")
+HEAD = {"User-Agent": "Mozilla/5.0", "Accept-Encoding": "gzip"}
 
-def load_or_build_faculty_dict(driver, base_url, year: str):
+# сколько работ обрабатываем одновременно и случайная пауза перед каждым запросом (в секундах)
+MAX_CONCURRENCY = 8
+DELAY_RANGE = (1.2, 2.0)
+
+# Селекторы страниц списка и страниц работ, компилируем один раз
+SEL_FACULTY_OPTION = CSSSelector("form select.vkr-filter__control option")
+SEL_CARD = CSSSelector("ul.vkr-list li.vkr-card")
+SEL_CARD_TITLE = CSSSelector("h3.vkr-card__title a")
+SEL_CARD_FACULTY = CSSSelector("p.vkr-card__item a.link")
+XP_CARD_YEAR = etree.XPath(".//p[contains(., 'Год защиты')]/span")
+XP_GETWORK = etree.XPath("//a[contains(@href, 'getwork')]/@href")
+
+
+def load_or_build_faculty_dict(base_url, year: str):
     """
     Загружаем или строим заново словарь факультетов с их id-факультета.
+    Список факультетов почти не меняется между годами, поэтому кеш общий для всех лет,
+    а браузер поднимается только при его отсутствии.
 
-    :param driver: Текущий driver selenium.
     :param base_url: Основная ссылка без параметров.
-    :param year: Год, в котором мы ищем словарь на странице.
+    :param year: Год, для страницы которого строится словарь при отсутствии кеша.
     :return: Искомый словарь.
     """
-    cache_file = f"faculty_dict_{year}.json"
-    if os.path.exists(cache_file):
-        with open(cache_file, "r", encoding="utf-8") as f:
-            faculty_dict = json.load(f)
-        print(f"Загружен кеш факультетов из {cache_file}")
+    if FACULTY_CACHE.exists():
+        faculty_dict = orjson.loads(FACULTY_CACHE.read_bytes())
+        print(f"Загружен кеш факультетов из {FACULTY_CACHE}")
         return faculty_dict
 
-    url = f"{base_url}?year={year}&language=ru&text_available=yes"
-    driver.get(url)
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "form select.vkr-filter__control"))
-    )
-    select_el = driver.find_element(By.CSS_SELECTOR, "form select.vkr-filter__control")
-    select = Select(select_el)
+    driver = webdriver.Chrome(options=parser_web.headless_options())
+
+    try:
+        url = f"{base_url}?year={year}&language=ru&text_available=yes"
+        driver.get(url)
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "form select.vkr-filter__control"))
+        )
+        # Забираем html один раз, чтобы не ходить в браузер за каждым option
+        tree = lxml.html.fromstring(driver.page_source)
+    finally:
+        driver.quit()
 
     faculty_dict = {}
 
     # Собираем словарь
-    for option in select.options:
-        name = option.text.replace('\xa0', ' ').strip()
-        value = option.get_attribute("value").strip()
+    for option in SEL_FACULTY_OPTION(tree):
+        name = text_of(option)
+        value = option.get("value", name).strip()
         if value:
             faculty_dict[name] = value
 
-    with open(cache_file, "w", encoding="utf-8") as f:
-        json.dump(faculty_dict, f, ensure_ascii=False, indent=2)
+    FACULTY_CACHE.write_bytes(orjson.dumps(faculty_dict, option=orjson.OPT_INDENT_2))
 
-    print(f"Словарь факультетов сохранён в {cache_file}")
+    print(f"Словарь факультетов сохранён в {FACULTY_CACHE}")
 
     return faculty_dict
 
 
-def process_save(pdf_path: str, title: str, topic: str, year: str, code: str):
+def make_client() -> httpx.AsyncClient:
+    """
+    Создаем http-клиент для страниц списка, страниц работ и файлов.
+    Соединения переиспользуются (keep-alive), при ошибке соединения делаем до 3 повторов.
     """
-    Скачиваем pdf (если его нет) и обрабатываем (если не обработали) в отдельном модуле,
-    затем сохраняем.
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=3,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+    )
+    return httpx.AsyncClient(transport=transport, headers=HEAD, follow_redirects=True, timeout=30)
 
-    :param pdf_path: Путь к pdf.
+
+async def run_limited(sem: asyncio.Semaphore, coro):
+    """
+    Выполняем корутину под семафором и со случайной паузой, чтобы не перегружать сайт.
+
+    :param sem: Общий семафор на хост.
+    :param coro: Корутина обработки работы.
+    :return: Результат корутины.
+    """
+    async with sem:
+        await asyncio.sleep(random.uniform(*DELAY_RANGE))
+        return await coro
+
+
+async def fetch_tree(client: httpx.AsyncClient, url: str):
+    """
+    Загружаем страницу и разбираем её в дерево lxml.
+
+    :param client: Http-клиент.
+    :param url: Ссылка на страницу.
+    :return: Корень html-дерева.
+    """
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return lxml.html.fromstring(resp.text)
+
+
+async def fetch_works(client: httpx.AsyncClient, year, faculty_code, page: int, faculty_dict: dict) -> list:
+    """
+    Загружаем страницу списка работ и собираем базовые данные карточек.
+
+    :param client: Http-клиент.
+    :param year: Год, в котором происходила защита работ.
+    :param faculty_code: Факультет, на котором происходила защита работ.
+    :param page: Номер страницы списка.
+    :param faculty_dict: Словарь факультетов с их id.
+    :return: Список словарей с данными работ (пустой, если карточек нет).
+    """
+    # Добавляем параметры. Обязательно наличие текста, язык работ - русский.
+    url = (
+        f"{BASE_URL}"
+        f"?faculty={faculty_code}"
+        f"&year={year}"
+        f"&language=ru"
+        f"&text_available=yes"
+        f"&page={page}"
+    )
+    tree = await fetch_tree(client, url)
+
+    works = []
+    for card in SEL_CARD(tree):
+        title_el = SEL_CARD_TITLE(card)[0]
+        title = text_of(title_el)
+
+        detail_url = urljoin(url, title_el.get("href"))
+        year_el = XP_CARD_YEAR(card)[0]
+
+        work_year = text_of(year_el)
+
+        faculty_name = text_of(SEL_CARD_FACULTY(card)[0])
+        faculty_code_parsed = faculty_dict.get(faculty_name, "UNKNOWN")
+
+        works.append({
+            "title": title,
+            "detail_url": detail_url,
+            "work_year": work_year,
+            "faculty_name": faculty_name,
+            "faculty_code": faculty_code_parsed
+        })
+
+    return works
+
+
+def write_json(path: Path, obj):
+    """
+    Сохраняем json через временный файл и подменяем им итоговый: ни падение, ни параллельный
+    процесс не оставят наполовину записанный файл, который потом сочтут обработанным.
+
+    :param path: Итоговый файл.
+    :param obj: Что сохраняем.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    os.replace(tmp, path)
+
+
+def process_save(pdf, title: str, topic: str, year: str, code: str):
+    """
+    Обрабатываем pdf в отдельном модуле (если работа ещё не обработана), затем сохраняем.
+
+    :param pdf: Путь к pdf или содержимое pdf (bytes).
     :param title: Заголовок работы.
     :param topic: Тема (факультет) работы.
     :param year: Год работы.
     :param code: Код факультета.
     """
-    fnj = OUT / f"{parser_web.get_md5_hash(title+year)}.json"
+    fnj = OUT / f"{parser_web.get_md5_hash(title + year)}.json"
 
+    # Множество done у каждого процесса обхода своё (при --all), и одну работу может забрать
+    # параллельный обход другого факультета - перед разбором проверяем, не сохранена ли она уже
     if fnj.exists():
-        print(f"[✓] Уже обработан")
+        print(f"[✓] Уже обработан: {fnj.name}")
         return
 
     try:
-        data = parser_pdf.parse(pdf_path)
+        if isinstance(pdf, bytes):
+            data = parser_pdf.parse_bytes(pdf, title)
+        else:
+            data = parser_pdf.parse(pdf)
     except Exception as e:
         print(f"Ошибка при разборе файла: {e}")
         traceback.print_exc()
@@ -97,8 +227,6 @@ def process_save(pdf_path: str, title: str, topic: str, year: str, code: str):
     if not intro_pages:
         return
 
-    fnj = OUT / f"{parser_web.get_md5_hash(title+year)}.json"
-
     # Если у нас есть страницы "Обзора", то сохраняем его тоже
     if review_pages:
         result = {
@@ -119,15 +247,14 @@ def process_save(pdf_path: str, title: str, topic: str, year: str, code: str):
             titles[0]: intro_pages
         }
 
-    with open(fnj, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    write_json(fnj, result)
 
 
-def process_pdf(file_path, work: dict):
+def process_pdf(pdf, work: dict):
     """
     Обрабатываем pdf.
 
-    :param file_path: Путь к файлу.
+    :param pdf: Путь к файлу или содержимое pdf (bytes).
     :param work: Словарь с нужными компонентами.
     """
     title = work['title']
@@ -135,7 +262,40 @@ def process_pdf(file_path, work: dict):
     topic = work['faculty_name']
     topic_code = work['faculty_code']
 
-    process_save(file_path, title, topic, year, topic_code)
+    process_save(pdf, title, topic, year, topic_code)
+
+
+def work_key(work: dict) -> str:
+    """
+    Ключ работы, под которым сохраняется её json.
+    """
+    return parser_web.get_md5_hash(work["title"] + work["work_year"])
+
+
+def load_done(out_dir: Path) -> set:
+    """
+    Собираем ключи уже обработанных работ (имена json без расширения) один раз перед обходом.
+    """
+    with os.scandir(out_dir) as it:
+        return {entry.name[:-5] for entry in it if entry.name.endswith(".json")}
+
+
+def take_new(works: list, done: set) -> list:
+    """
+    Отбираем ещё не обработанные работы и сразу помечаем их в done,
+    чтобы повторы на этой и следующих страницах не попали в обработку второй раз.
+
+    :param works: Работы со страницы списка.
+    :param done: Ключи уже обработанных работ.
+    :return: Новые работы.
+    """
+    todo = []
+    for work in works:
+        key = work_key(work)
+        if key not in done:
+            done.add(key)
+            todo.append(work)
+    return todo
 
 
 def sanitize_filename(name: str):
@@ -145,141 +305,202 @@ def sanitize_filename(name: str):
     return re.sub(r'[\\/*?:"<>|]', "_", name)
 
 
-def main(year, faculty_code):
+async def process_work(client: httpx.AsyncClient, pool: ProcessPoolExecutor, work: dict, download_dir: str):
     """
-    Основной код парсера. Итерируемся по страницам и переходим на каждую работу.
+    Переходим на страницу работы, скачиваем файл и обрабатываем его.
+    Разбор pdf нагружает процессор, поэтому выполняется в пуле процессов.
+    Word-файлы только скачиваются: их конвертируем сразу пачкой для всей страницы.
+
+    :param client: Http-клиент.
+    :param pool: Пул процессов для разбора pdf.
+    :param work: Словарь с нужными компонентами.
+    :param download_dir: Папка для временных файлов (нужна только для конвертации Word).
+    :return: Пара (работа, путь к скачанному Word-файлу) или None, если файл уже обработан или не найден.
+    """
+    print(f"— {work['title']} | {work['work_year']} | {work['faculty_name']} -> {work['faculty_code']}")
+    loop = asyncio.get_running_loop()
+
+    try:
+        tree = await fetch_tree(client, work["detail_url"])
+        file_url = urljoin(work["detail_url"], XP_GETWORK(tree)[0])
+        print(f"[↑] Скачиваем файл: {file_url}")
+
+        work_id = work["detail_url"].rstrip("/").split("/")[-1]
+        _, ext = os.path.splitext(file_url)
+
+        ext = ext.lower() or '.pdf'  # если расширение не в URL, считаем PDF
+
+        # Обычный pdf обрабатываем прямо из памяти, не сохраняя на диск
+        if ext not in ('.doc', '.docx'):
+            r = await client.get(file_url)
+            r.raise_for_status()
+
+            print(f"[→] Вызываем обработку PDF: {work_id}")
+            await loop.run_in_executor(pool, process_pdf, r.content, work)
+            return None
+
+        orig_filename = sanitize_filename(f"{work_id}{ext}")
+        orig_path = os.path.join(download_dir, orig_filename)
+
+        # Word скачиваем на диск, поскольку soffice работает только с файлами
+        async with client.stream("GET", file_url) as r:
+            r.raise_for_status()
+            with open(orig_path, "wb") as f:
+                async for chunk in r.aiter_bytes(chunk_size=8192):
+                    f.write(chunk)
+
+        return work, orig_path
+    except Exception:
+        print(" PDF не найден, пропускаем.")
+        return None
+
+
+async def process_converted(pool: ProcessPoolExecutor, work: dict, pdf_path: str):
+    """
+    Обрабатываем pdf, полученный конвертацией Word, и удаляем его.
+
+    :param pool: Пул процессов для разбора pdf.
+    :param work: Словарь с нужными компонентами.
+    :param pdf_path: Путь к pdf.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        print(f"[→] Вызываем обработку PDF: {pdf_path}")
+        await loop.run_in_executor(pool, process_pdf, pdf_path, work)
+
+        # Удаляем PDF
+        os.remove(pdf_path)
+        print(" Удалили локальный файл PDF")
+    except Exception:
+        print(" PDF не найден, пропускаем.")
+
+
+async def process_word_files(pool: ProcessPoolExecutor, word_files: list, download_dir: str):
+    """
+    Конвертируем все Word-файлы страницы в pdf одним запуском soffice (запуск LibreOffice сам по себе долгий),
+    затем обрабатываем полученные pdf. Сломанный файл не должен терять остальные,
+    поэтому успех конвертации проверяем для каждого файла по наличию его pdf.
+
+    :param pool: Пул процессов для разбора pdf.
+    :param word_files: Пары (работа, путь к скачанному Word-файлу).
+    :param download_dir: Папка для временных файлов.
+    """
+    print(f"[→] Конвертация {len(word_files)} файлов в PDF...")
+
+    # Успех конвертации проверяем по наличию pdf, поэтому старые pdf (например, от упавшего запуска) удаляем
+    for _, orig_path in word_files:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.splitext(orig_path)[0] + ".pdf")
+
+    try:
+        # soffice должен быть в PATH; код возврата не смотрим - он ненулевой, даже если не сконвертировался один файл
+        await asyncio.to_thread(subprocess.run, [
+            # Отдельный профиль на процесс, иначе параллельные обходы факультетов мешают друг другу
+            "soffice", "--headless", f"-env:UserInstallation=file:///tmp/soffice-{os.getpid()}",
+            "--convert-to", "pdf",
+            "--outdir", download_dir,
+            *(orig_path for _, orig_path in word_files)
+        ])
+    except Exception as e:
+        print(f" Не удалось запустить конвертацию: {e}")
+
+    converted = []
+    for work, orig_path in word_files:
+        # Удаляем исходный Word
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(orig_path)
+
+        pdf_path = os.path.splitext(orig_path)[0] + ".pdf"
+        if os.path.exists(pdf_path):
+            converted.append((work, pdf_path))
+        else:
+            print(f" Не удалось сконвертировать {orig_path}, пропускаем.")
+
+    await asyncio.gather(*(
+        process_converted(pool, work, pdf_path)
+        for work, pdf_path in converted
+    ))
+
+
+async def crawl(year, faculty_code, pdf_workers: int = None):
+    """
+    Готовим словарь факультетов, http-клиент и пул процессов, затем обходим страницы списка.
 
     :param year: Год, в котором происходила защита работ.
     :param faculty_code: Факультет, на котором происходила защита работ.
+    :param pdf_workers: Число процессов для разбора pdf (по умолчанию - число ядер).
     """
-    # основная ссылка без параметров
-    base_url = "https://www.hse.ru/edu/vkr/"
-
     # место сохранения pdf и json файлов
     download_dir = os.path.join(os.getcwd(), "downloads")
     os.makedirs(download_dir, exist_ok=True)
 
-    # настраиваем driver
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    driver = webdriver.Chrome(options=chrome_options)
+    faculty_dict = load_or_build_faculty_dict(BASE_URL, year)
+    print("Факультеты:", faculty_dict)
 
-    try:
-        faculty_dict = load_or_build_faculty_dict(driver, base_url, year)
-        print("Факультеты:", faculty_dict)
-
-        page = 1
-        while True:
-            # Добавляем параметры. Обязательно наличие текста, язык работ - русский.
-            url = (
-                f"{base_url}"
-                f"?faculty={faculty_code}"
-                f"&year={year}"
-                f"&language=ru"
-                f"&text_available=yes"
-                f"&page={page}"
-            )
-            driver.get(url)
-            # Ждём, пока хотя бы одно вхождение карточки появится (или таймаут)
-            try:
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "ul.vkr-list li.vkr-card"))
-                )
-            except:
-                print(f"Страница {page}: карточек не найдено -> завершаем.")
-                break
-
-            cards = driver.find_elements(By.CSS_SELECTOR, "ul.vkr-list li.vkr-card")
-            if not cards:
-                print(f"Страница {page}: пусто -> завершаем.")
-                break
-
-            print(f"Страница {page} -> найдено {len(cards)} работ")
-
-            # Собираем базовые данные без WebElement
-            works = []
-            for card in cards:
-                title_el = card.find_element(By.CSS_SELECTOR, "h3.vkr-card__title a")
-                title = title_el.text.strip()
-
-                detail_url = title_el.get_attribute("href")
-                year_el = card.find_element(By.XPATH, ".//p[contains(., 'Год защиты')]/span")
-
-                work_year = year_el.text.strip()
-
-                faculty_name = card.find_element(By.CSS_SELECTOR, "p.vkr-card__item a.link").text.strip()
-                faculty_code_parsed = faculty_dict.get(faculty_name, "UNKNOWN")
-
-                works.append({
-                    "title": title,
-                    "detail_url": detail_url,
-                    "work_year": work_year,
-                    "faculty_name": faculty_name,
-                    "faculty_code": faculty_code_parsed
-                })
-
-            for work in works:
-                print(f"— {work['title']} | {work['work_year']} | {work['faculty_name']} -> {work['faculty_code']}")
-                driver.get(work["detail_url"])
-                time.sleep(1)
-
-                try:
-                    pdf_link_el = driver.find_element(By.XPATH, "//a[contains(@href, 'getwork')]")
-                    file_url = pdf_link_el.get_attribute("href")
-                    print(f"[↑] Скачиваем файл: {file_url}")
-
-                    work_id = work["detail_url"].rstrip("/").split("/")[-1]
-                    _, ext = os.path.splitext(file_url)
-
-                    ext = ext.lower() or '.pdf'  # если расширение не в URL, считаем PDF
-
-                    orig_filename = sanitize_filename(f"{work_id}{ext}")
-                    orig_path = os.path.join(download_dir, orig_filename)
-
-                    # Скачиваем файл
-                    with requests.get(file_url, stream=True) as r:
-                        r.raise_for_status()
-                        with open(orig_path, "wb") as f:
-                            for chunk in r.iter_content(chunk_size=8192):
-                                f.write(chunk)
-
-                    # Если это Word, конвертируем в PDF
-                    if ext in ('.doc', '.docx'):
-                        print(f"[→] Конвертация {orig_filename} в PDF...")
-                        # soffice должен быть в PATH
-                        subprocess.run([
-                            "soffice", "--headless",
-                            "--convert-to", "pdf",
-                            "--outdir", download_dir,
-                            orig_path
-                        ], check=True)
-
-                        pdf_filename = sanitize_filename(f"{work_id}.pdf")
-                        pdf_path = os.path.join(download_dir, pdf_filename)
-
-                        # Удаляем исходный Word
-                        os.remove(orig_path)
-                    else:
-                        # уже PDF
-                        pdf_path = orig_path
-
-                    print(f"[→] Вызываем обработку PDF: {pdf_path}")
-                    process_pdf(pdf_path, work)
-
-                    # Удаляем PDF
-                    os.remove(pdf_path)
-                    print(" Удалили локальный файл PDF")
-                except Exception:
-                    print(" PDF не найден, пропускаем.")
-
-            page += 1
-            time.sleep(1)
-
-        print("Парсинг завершён.")
+    OUT.mkdir(exist_ok=True)
+    done = load_done(OUT)
+
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    with ProcessPoolExecutor(max_workers=pdf_workers or os.cpu_count()) as pool:
+        async with make_client() as client:
+            await crawl_pages(client, pool, sem, year, faculty_code, faculty_dict, download_dir, done)
+
+    print("Парсинг завершён.")
 
-    finally:
-        driver.quit()
+
+async def crawl_pages(client: httpx.AsyncClient, pool: ProcessPoolExecutor, sem: asyncio.Semaphore,
+                      year, faculty_code, faculty_dict: dict, download_dir: str, done: set):
+    """
+    Итерируемся по страницам списка, пока на них есть карточки работ.
+    Уже обработанные работы пропускаем до загрузки их страниц и файлов.
+
+    :param client: Http-клиент.
+    :param pool: Пул процессов для разбора pdf.
+    :param sem: Общий семафор на хост.
+    :param year: Год, в котором происходила защита работ.
+    :param faculty_code: Факультет, на котором происходила защита работ.
+    :param faculty_dict: Словарь факультетов с их id.
+    :param download_dir: Папка для временных файлов.
+    :param done: Ключи уже обработанных работ.
+    """
+    page = 1
+    while True:
+        try:
+            works = await fetch_works(client, year, faculty_code, page, faculty_dict)
+        except httpx.HTTPError as e:
+            print(f"Страница {page}: ошибка загрузки ({e}) -> завершаем.")
+            break
+
+        if not works:
+            print(f"Страница {page}: карточек не найдено -> завершаем.")
+            break
+
+        todo = take_new(works, done)
+        print(f"Страница {page} -> найдено {len(works)} работ, из них новых {len(todo)}")
+
+        tasks = [
+            asyncio.create_task(run_limited(sem, process_work(client, pool, work, download_dir)))
+            for work in todo
+        ]
+        word_files = [res for res in await asyncio.gather(*tasks) if res]
+
+        if word_files:
+            await process_word_files(pool, word_files, download_dir)
+
+        page += 1
+        await asyncio.sleep(1)
+
+
+def main(year, faculty_code, pdf_workers: int = None):
+    """
+    Основной код парсера. Итерируемся по страницам и переходим на каждую работу.
+
+    :param year: Год, в котором происходила защита работ.
+    :param faculty_code: Факультет, на котором происходила защита работ.
+    :param pdf_workers: Число процессов для разбора pdf (по умолчанию - число ядер).
+    """
+    asyncio.run(crawl(year, faculty_code, pdf_workers))
 
 
 PARSE_YEARS = list(range(2022, 2012, -1))
@@ -336,17 +557,56 @@ PARSE_CODE = [
     "1030791"     # Высшая школа юриспруденции и администрирования
 ]
 
-# Итерируемся по всем годам и факультетам
-# for code in PARSE_CODE:
-#     for year in PARSE_YEARS:
-#         print(f"******** {str(code)} {str(year)} ***********")
-#         main(year, code)
-#     print('*' * 10)
+# Сколько факультетов обходим одновременно при полном обходе
+SWEEP_WORKERS = 4
+
+
+def parse_faculty(code, pdf_workers: int = None):
+    """
+    Обходим все годы одного факультета.
+
+    :param code: Код факультета.
+    :param pdf_workers: Число процессов для разбора pdf.
+    """
+    for year in PARSE_YEARS:
+        print(f"******** {str(code)} {str(year)} ***********")
+        main(year, code, pdf_workers)
+    print('*' * 10)
+
+
+def parse_all(workers: int = SWEEP_WORKERS):
+    """
+    Итерируемся по всем годам и факультетам. Факультеты обходятся параллельно в отдельных процессах,
+    годы одного факультета - последовательно, чтобы не бить в один и тот же раздел сайта одновременно.
+
+    :param workers: Сколько факультетов обходим одновременно.
+    """
+    # Словарь факультетов строим один раз здесь, процессы дальше читают готовый кеш
+    load_or_build_faculty_dict(BASE_URL, PARSE_YEARS[0])
+
+    # Ядра делим между обходами, чтобы пулы разбора pdf не конкурировали друг с другом
+    pdf_workers = max(1, os.cpu_count() // workers)
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(parse_faculty, code, pdf_workers) for code in PARSE_CODE]
+        for code, future in zip(PARSE_CODE, futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Факультет {code}: обход прерван ({e})")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Парсер дипломных работ НИУ ВШЭ")
-    parser.add_argument("--year", required=True, help="Год защиты")
-    parser.add_argument("--faculty", required=True, help="Код факультета")
+    parser.add_argument("--year", help="Год защиты")
+    parser.add_argument("--faculty", help="Код факультета")
+    parser.add_argument("--all", action="store_true", help="Обойти все годы PARSE_YEARS и факультеты PARSE_CODE")
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS,
+                        help="Сколько факультетов обходить одновременно при --all")
     args = parser.parse_args()
-    main(args.year, args.faculty)
+    if args.all:
+        parse_all(args.workers)
+    elif args.year and args.faculty:
+        main(args.year, args.faculty)
+    else:
+        parser.error("нужны --year и --faculty либо --all")
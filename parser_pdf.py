@@ -8,20 +8,95 @@
 
 import fitz
 import re
+import functools
+import numpy as np
 from pathlib import Path
-from collections import Counter
-from statistics import median
+from collections.abc import Iterable
+
+# Флаги извлечения текста: как у get_text("dict"), но без содержимого картинок (их блоки мы всё равно пропускаем)
+TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Ключевые слова страницы содержания: ищем все одним проходом по тексту страницы
+RE_TOC_KEYWORDS = re.compile(r'\b(Оглавление|Содержание|Введение|Заключение)\b', re.IGNORECASE)
+TOC_TITLES = {'оглавление', 'содержание'}
+# Заголовок содержания, склеившийся с первым пунктом
+RE_TOC_TITLE = re.compile(r'\b(Оглавление|Содержание)\b', re.IGNORECASE)
+
+# Тире, которыми иногда обрамляют номер страницы
+PAGE_NUM_DASHES = "-–—"
+# Блок оглавления: буквы, цифры, точки-заполнители и строка с чистым номером страницы
+RE_HAS_LETTER = re.compile(r'[А-Яа-яA-Za-z]')
+RE_HAS_DIGIT = re.compile(r'\d')
+RE_DOTS = re.compile(r'\.{2,}')
+RE_PURE_NUM = re.compile(r'^\s*(\d+)\s*$')
+
+# Вложенные главы типа "2.1" или "2.1.2"
+RE_NESTED_CHAPTER = re.compile(r'^\s*\d+\.\d')
+
+# Окончание предложения и "число." внутри подписи
+RE_SENT_END = re.compile(r'[\.!?]$')
+RE_NUM_DOT = re.compile(r"\d+\.")
+
+# Любой новый заголовок с номером раздела в начале строки
+RE_ANY_HEADING = re.compile(r'^\s*\d+(\.\d+)*\[а-яА-я]+\b')
+
+# Маркеры элементов списка; ещё элемент может начинаться с "1)"
+LIST_MARKERS = ('-', '•', '–')
+
+
+def char_class(ch: str):
+    """
+    Класс символа для подсчёта доли кириллицы: 'c' - кириллица (А-я, Ёё), 'a' - другая буква, None - не буква.
+    """
+    if "А" <= ch <= "я" or ch in "Ёё":
+        return 'c'
+    return 'a' if ch.isalpha() else None
+
+
+# Таблица классов для всех символов до U+0500 (латиница, знаки, кириллица): str.translate заменяет
+# буквы на 'c'/'a' и удаляет остальное. Символы дальше U+0500 остаются как есть
+CHAR_CLASS_TABLE = {code: char_class(chr(code)) for code in range(0x500)}
+
+
+def cached_on_doc(func):
+    """
+    Запоминаем результат функции от документа прямо на объекте документа,
+    чтобы повторные вызовы не перечитывали страницы заново.
+    Исключения не кешируются.
+
+    :param func: Функция, принимающая только документ.
+    :return: Обёртка над функцией.
+    """
+    attr = f"_cache_{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(doc):
+        if attr not in doc.__dict__:
+            setattr(doc, attr, func(doc))
+        return doc.__dict__[attr]
+
+    return wrapper
 
 
 # Находим страницу содержания по ключевым словам
+@cached_on_doc
 def find_content(doc):
     toc_idx = None
     for i, page in enumerate(doc):
         txt = page.get_text("text")
-        if re.search(r'\b(Оглавление|Содержание)\b', txt, re.IGNORECASE) or \
-            re.search(r'\b(Введение)\b', txt, re.IGNORECASE) and \
-                re.search(r'\b(Заключение)\b', txt, re.IGNORECASE):
-            toc_idx = i
+        found = set()
+        for m in RE_TOC_KEYWORDS.finditer(txt):
+            word = m.group(1).lower()
+            # Заголовок содержания - сразу наша страница
+            if word in TOC_TITLES:
+                toc_idx = i
+                break
+            found.add(word)
+        else:
+            # Либо на странице есть и "Введение", и "Заключение"
+            if len(found) == 2:
+                toc_idx = i
+        if toc_idx is not None:
             break
     if toc_idx is None:
         raise RuntimeError("Не найдена страница с оглавлением")
@@ -30,43 +105,32 @@ def find_content(doc):
 
 def get_real_page(doc, toc_idx: int) -> list:
     """
-    Ищем номер страницы (блок с числом внизу) на самой странице.
+    Ищем номер страницы (слово-число у верхнего или нижнего края) на самой странице.
 
     :param doc: Сам документ.
     :param toc_idx: Индекс страницы по ходу чтения pdf.
     :return: Список вариантов для номера страницы.
     """
     page = doc[toc_idx]
-    blocks = page.get_text("blocks")
-
-    page_numbers = []
-    for b in blocks:
-        x0, y0, x1, y1, text, _, _ = b
-        for ln in text.splitlines():
-            if re.fullmatch(r"\d|.\d", ln.strip()):
-                if len(ln) == 2:
-                    if ln[1].isnumeric():
-                        num = int(ln[1])
-                    else:
-                        continue
-                else:
-                    num = int(ln.strip())
-                page_numbers.append({
-                    "num": num,
-                    "x0": x0, "x1": x1, "y0": y0, "y1": y1
-                })
-
-    # Можно отобрать те, у кого y0 < page_height*0.1 или y1 > page_height*0.9
     ph = page.rect.height
 
-    page_num_loc = [
-        pn for pn in page_numbers
-        if pn["y0"] < 0.1 * ph or pn["y1"] > 0.9 * ph
-    ]
+    # Отбираем только слова у краёв: y0 < page_height*0.1 или y1 > page_height*0.9
+    page_num_loc = []
+    for x0, y0, x1, y1, word, *_ in page.get_text("words"):
+        if not (y0 < 0.1 * ph or y1 > 0.9 * ph):
+            continue
+        # Номер страницы может быть оформлен как "- 12 -" или "–12–"
+        word = word.strip(PAGE_NUM_DASHES)
+        if len(word) <= 3 and word.isdecimal():
+            page_num_loc.append({
+                "num": int(word),
+                "x0": x0, "x1": x1, "y0": y0, "y1": y1
+            })
 
     return page_num_loc
 
 
+@cached_on_doc
 def get_real_content_page(doc):
     """
     Ищем страницу содержания посредством перебора пар, поскольку на самой странице
@@ -119,11 +183,11 @@ def processing_block(blocks):
 
         old_case = False
         # блок должен содержать буквы и цифры
-        if not re.search(r'[А-Яа-яA-Za-z]', text) or not re.search(r'\d', text):
+        if not RE_HAS_LETTER.search(text) or not RE_HAS_DIGIT.search(text):
             continue
         # поддерживаем старые версии
         if '...' in text:
-            text = re.sub(r'\.{2,}', '\n', text)
+            text = RE_DOTS.sub('\n', text)
             old_case = True
 
         lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
@@ -136,7 +200,7 @@ def processing_block(blocks):
         begin = 1
 
         # если склеилось оглавление
-        if re.search(r'\b(Оглавление|Содержание)\b', title, re.IGNORECASE):
+        if RE_TOC_TITLE.search(title):
             title = lines[1]
             begin = 2
 
@@ -153,7 +217,7 @@ def processing_block(blocks):
             page_num = None
             # найдем первое чистое число в оставшихся строках
             for i in range(len(lines[begin:])):
-                m = re.match(r'^\s*(\d+)\s*$', lines[begin+i])
+                m = RE_PURE_NUM.match(lines[begin+i])
                 if m:
                     page_num = int(m.group(1))
                     tail = i
@@ -193,11 +257,25 @@ def repair_content(doc):
     # сортируем по y0 (чтобы сохранить верх→низ)
     entries.sort(key=lambda e: e["y0"])
 
-    # отбрасываем последний пункт, если его page == toc_idx+1 (номер страницы оглавления)
-    entries = [e for e in entries if get_page_doc(doc, e["page"], toc_idx) != toc_idx]
+    # отбрасываем пункт, указывающий на саму страницу оглавления (номер страницы оглавления в pdf)
+    real_num_cont = get_real_content_page(doc)
+    if real_num_cont is None:
+        raise RuntimeError("Не удалось определить номер страницы оглавления")
+    entries = [e for e in entries if e["page"] != real_num_cont]
     return [(e["title"], e["page"]) for e in entries]
 
 
+@cached_on_doc
+def page_offset(doc):
+    """
+    Сдвиг между индексом страницы в pdf и напечатанным на ней номером (считается по странице содержания).
+
+    :param doc: Сам документ.
+    :return: Число, которое надо прибавить к номеру страницы, чтобы получить её индекс.
+    """
+    return find_content(doc) - get_real_content_page(doc)
+
+
 def get_page_doc(doc, num_real: int, num_cont=None):
     """
     Получаем индекс страницы (не тот, что в самом pdf) для итерации.
@@ -208,9 +286,8 @@ def get_page_doc(doc, num_real: int, num_cont=None):
     :return: Индекс страницы искомой страницы.
     """
     if not num_cont:
-        num_cont = find_content(doc)
-    real_num_cont = get_real_content_page(doc)
-    return (num_cont - real_num_cont) + num_real
+        return num_real + page_offset(doc)
+    return (num_cont - get_real_content_page(doc)) + num_real
 
 
 # Находим диапазон страниц для введения
@@ -238,6 +315,23 @@ def get_introduction_range(entries: list):
     raise ValueError("Раздел 'Введение' не найден в содержании")
 
 
+def next_non_nested(entries: list, start: int):
+    """
+    Ищем следующий раздел верхнего уровня, пропуская вложенные главы типа "2.1".
+
+    :param entries: Содержание.
+    :param start: Индекс, с которого начинаем поиск.
+    :return: Индекс найденного раздела или None, если до конца содержания (или до пустого заголовка) его нет.
+    """
+    for k in range(start, len(entries)):
+        title = entries[k][0]
+        if not title:
+            return None
+        if not RE_NESTED_CHAPTER.match(title):
+            return k
+    return None
+
+
 # Находим диапазон страниц для обзора или метода
 def get_review_range(entries: list):
     """
@@ -250,9 +344,6 @@ def get_review_range(entries: list):
     not_review_keywords = ['список литературы']
     fallback_keywords = ['постановка', 'задач', 'цель']
 
-    # шаблон для вложенных глав типа "2.1" или "2.1.2"
-    ignore_pattern = re.compile(r'^\s*\d+\.\d')
-
     # индекс введения в содержании
     intro_index, _, _, _ = get_introduction_range(entries)
 
@@ -260,76 +351,39 @@ def get_review_range(entries: list):
     for j in range(intro_index + 1, len(entries)):
         title, page = entries[j]
         # пропускаем вложенные главы
-        if ignore_pattern.match(title):
+        if RE_NESTED_CHAPTER.match(title):
             continue
         # пропускаем главы, содержащие цели и задачи диплома
         if any(kw in title.lower() for kw in review_keywords) and \
                 not any(kw in title.lower() for kw in not_review_keywords):
-            i = 0
             # ищем следующий раздел для нахождения правой границы
-            while True:
-                next_title = entries[j + 1 + i][0] if j + i + 1 < len(entries) else None
-                if not next_title:
-                    break
-                if ignore_pattern.match(next_title):
-                    i += 1
-                    continue
-
-                next_page = entries[j + i + 1][1] if j + i + 1 < len(entries) else None
-                end_page = next_page - 1 if next_page is not None else None
-
-                if end_page < page:
-                    end_page = page
-                title = 'Обзор'
-                return title.lower(), page, end_page
+            k = next_non_nested(entries, j + 1)
+            if k is not None:
+                end_page = max(entries[k][1] - 1, page)
+                return 'обзор', page, end_page
 
     print('Обзор не найден, ищем "Метод" или похожие разделы')
 
     # fallback – поиск "Метода" или похожих разделов
     for j in range(intro_index + 1, len(entries)):
         title, _ = entries[j]
-        if ignore_pattern.match(title):
+        if RE_NESTED_CHAPTER.match(title):
             continue
         # если нашли раздел с целями, то следующий раздел нам подходит
         if any(kw in title.lower() for kw in fallback_keywords):
             title_new = entries[j + 1][0] if j + 1 < len(entries) else None
             page_new = entries[j + 1][1] if j + 1 < len(entries) else None
-            i = 0
-            # ищем следующий раздел для нахождения правой границы
-            while True:
-                next_title = entries[j + 2 + i][0] if j + 2 + i < len(entries) else None
-                if not next_title:
-                    break
-                if ignore_pattern.match(next_title):
-                    i += 1
-                    continue
-
-                next_page = entries[j + 2 + i][1] if j + 2 + i < len(entries) else None
-                end_page = next_page - 1 if next_page is not None else None
-
-                if end_page < next_page:
-                    end_page = next_page
-                return title_new, page_new, end_page
+            # ищем следующий раздел для нахождения правой границы, правой границей берём его страницу
+            k = next_non_nested(entries, j + 2)
+            if k is not None:
+                return title_new, page_new, entries[k][1]
 
         # либо нам подходит раздел после введения, не содержащий цели и задачи диплома
-        if not any(kw in title.lower() for kw in fallback_keywords):
-            title_new = entries[j][0]
-            page_new = entries[j][1]
-            i = 0
-            while True:
-                next_title = entries[j + i + 1][0] if j + 1 + i < len(entries) else None
-                if not next_title:
-                    break
-                if ignore_pattern.match(next_title):
-                    i += 1
-                    continue
-
-                next_page = entries[j + 1 + i][1] if j + 1 + i < len(entries) else None
-                end_page = next_page - 1 if next_page is not None else None
-
-                if end_page < next_page:
-                    end_page = next_page
-                return title_new, page_new, end_page
+        else:
+            title_new, page_new = entries[j]
+            k = next_non_nested(entries, j + 1)
+            if k is not None:
+                return title_new, page_new, entries[k][1]
 
     raise ValueError("Разделы 'Обзор' или 'Метод' не найдены в содержании")
 
@@ -339,7 +393,7 @@ def get_pages_for_parsing(doc):
     Получаем листы со страницами, которые необходимо парсить.
 
     :param doc: Сам документ.
-    :return: Пара заголовков глав для парсинга, лист страниц введения, лист страниц обзора (если есть),
+    :return: Пара заголовков глав для парсинга, диапазон страниц введения, диапазон страниц обзора (если есть),
     флаг наличия содержания, флаг наличия "Введения".
     """
     entries = None
@@ -361,39 +415,114 @@ def get_pages_for_parsing(doc):
         intro_title = 'введение'
         review_title = 'обзор'
 
-        beg_intro, end_intro = find_section_range(doc, intro_title, False)
+        # Оба раздела ищем за один проход по документу
+        ranges = find_section_ranges(doc, [intro_title, review_title])
 
-        try:
-            beg_review, end_review = find_section_range(doc, review_title, False)
-        except Exception as err:
-            print(f"Ошибка при поиске 'Обзора' при отсутствии содержания: {err}")
+        if intro_title not in ranges:
+            raise section_not_found(intro_title)
+        beg_intro, end_intro = ranges[intro_title]
+
+        if review_title in ranges:
+            beg_review, end_review = ranges[review_title]
+        else:
+            print(f"Ошибка при поиске 'Обзора' при отсутствии содержания: {section_not_found(review_title)}")
             flag_review = False
 
         flag_content = False
     else:
+        # Номера страниц из содержания переводим в индексы pdf одним сдвигом
+        offset = page_offset(doc)
+
         _, beg_intro, end_intro, intro_title = get_introduction_range(entries)
-        beg_intro, end_intro = get_page_doc(doc, beg_intro), get_page_doc(doc, end_intro)
+        beg_intro, end_intro = beg_intro + offset, end_intro + offset
 
         try:
             review_title, beg_review, end_review = get_review_range(entries)
-            beg_review, end_review = get_page_doc(doc, beg_review), get_page_doc(doc, end_review)
+            beg_review, end_review = beg_review + offset, end_review + offset
         except Exception as err:
             print(f"Ошибка при поиске 'Обзора' при найденном содержании: {err}")
             flag_review = False
 
-    if beg_intro and end_intro:
-        intro_pages = list(range(beg_intro, end_intro + 1))
+    # страница с индексом 0 тоже допустима, поэтому сравниваем именно с None
+    if beg_intro is not None and end_intro is not None:
+        intro_pages = range(beg_intro, end_intro + 1)
     else:
         intro_pages = None
 
     # поскольку не у всех документов есть "Обзор" и похожие разделы
-    if flag_review:
-        review_pages = list(range(beg_review, end_review + 1))
+    if flag_review and beg_review is not None and end_review is not None:
+        review_pages = range(beg_review, end_review + 1)
+    else:
+        flag_review = False
 
     return (intro_title, review_title), intro_pages, review_pages, flag_content, flag_review
 
 
-def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_content=True) -> list[str]:
+def decode_cp1251(text: str) -> str:
+    """
+    Исправляем сбитую кодировку: текст в CP1251, прочитанный как Latin-1.
+
+    :param text: Исходный текст спана.
+    :return: Перекодированный текст или исходный, если перекодировать не получилось.
+    """
+    try:
+        # Пытаемся «перекодировать» из Latin-1 → CP1251
+        return text.encode("latin-1").decode("cp1251", errors="ignore")
+    except UnicodeError:
+        # Если не получилось (есть символы вне Latin-1) — оставляем как есть
+        return text
+
+
+def cyrillic_ratio(text: str):
+    """
+    Доля кириллицы среди букв текста. Считаем без посимвольного цикла на Python.
+
+    :param text: Текст блока.
+    :return: Доля кириллических букв или None, если букв нет вовсе.
+    """
+    classes = text.translate(CHAR_CLASS_TABLE)
+    cyrillic_count = classes.count('c')
+    alpha_count = cyrillic_count + classes.count('a')
+    # Остались символы вне таблицы (дальше U+0500) - буквы среди них досчитываем отдельно
+    if len(classes) != alpha_count:
+        alpha_count += sum(map(str.isalpha, classes.replace('c', '').replace('a', '')))
+    if not alpha_count:
+        return None
+    return cyrillic_count / alpha_count
+
+
+def is_list_start(line: str) -> bool:
+    """
+    Начинается ли строка с элемента списка: маркер или номер со скобкой ("1)"), допускается отступ.
+
+    :param line: Строка текста.
+    :return: True, если это начало элемента списка.
+    """
+    head = line.lstrip()
+    if head[:1] in LIST_MARKERS:
+        return True
+    num, bracket, _ = head.partition(')')
+    return bool(bracket) and num.isdecimal()
+
+
+def block_stats(text: str):
+    """
+    Считаем всё, что нужно фильтрам, по тексту блока без списков строк и лишних копий.
+
+    :param text: Текст блока (строки через перенос строки).
+    :return: Первая строка (без отступа), последняя строка, длина без учёта переносов,
+    флаг одной скобки (скорее всего продолжение в следующей строке), флаг переноса в конце.
+    """
+    first_line = text.partition("\n")[0].lstrip()
+    last_line = text.rpartition("\n")[2].strip()
+    stripped = text.strip()
+    plain_len = len(stripped) - stripped.count("\n")
+    single_bracket = text.count("(") + text.count(")") == 1
+    return first_line, last_line, plain_len, single_bracket, stripped.endswith('-')
+
+
+def extract_paragraphs_from_pages(doc: fitz.Document | str | Path, page_numbers: Iterable[int],
+                                  flag_content=True) -> list[str]:
     """
     Извлекает блоки текстов из указанных страниц PDF, сохраняя их целиком,
     склеивая незаконченные предложения между блоками и страницами,
@@ -402,16 +531,17 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
     восклицательным знаком. Если последний блок на странице не заканчивается
     таким знаком, он склеивается с первым непустым абзацем следующей страницы.
 
-    :param pdf_path: Путь к PDF-файлу.
-    :param page_numbers: Список номеров страниц, из которых нужно извлекать текст;
+    :param doc: Сам документ или путь к pdf (тогда он открывается только на время вызова).
+    :param page_numbers: Номера страниц (список или range), из которых нужно извлекать текст;
     :param flag_content: Флаг наличия содержания.
     :return: Список строк, каждая строка – извлечённый блок текста.
     """
-    doc = fitz.open(pdf_path)
-    paragraphs: list[str] = []
+    # Уже открытый документ используем как есть, чтобы не разбирать pdf заново на каждый раздел
+    if isinstance(doc, (str, Path)):
+        with fitz.open(doc) as opened:
+            return extract_paragraphs_from_pages(opened, page_numbers, flag_content)
 
-    # Шаблон для проверки окончания предложения
-    sentence_endings = re.compile(r'[\.!?]$')
+    paragraphs: list[str] = []
 
     # Эвристики:
     FONT_SIZE_DIFF_THRESHOLD = 1.0    # Порог отклонения шрифта от доминирующего
@@ -420,7 +550,6 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
     CAPTION_MAX_CHARS = 60            # Максимальное число символов в подписи к картинке
     CENTER_TOLERANCE_RATIO = 0.7      # Допуск по смещению центра блока относительно центра страницы
     MIN_CYRILLIC_RATIO = 0.5
-    LIST_START_PATTERN = re.compile(r'^\s*(?:\d+[\)]|[-•–])')
     GAP_MULTIPLIER = 2.5
 
     # Незавершённый текст с предыдущей страницы
@@ -431,69 +560,98 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
 
     for page_num in page_numbers:
         page = doc.load_page(page_num)
-        page_dict = page.get_text("dict")
+        page_dict = page.get_text("dict", flags=TEXT_FLAGS)
         blocks = page_dict["blocks"]
 
         page_rect = page.rect
         page_width = page_rect.width
 
-        # Собираем все размеры шрифтов на странице
-        all_font_sizes = []
-        all_font_names = []
+        # Пороги, зависящие только от страницы, считаем один раз
+        page_center_x = page_width / 2
+        center_tolerance = CENTER_TOLERANCE_RATIO * page_width
+        min_block_width = MIN_BLOCK_WIDTH_RATIO * page_width
+
+        # Один проход по текстовым блокам: тексты, геометрия и шрифты каждого блока,
+        # а также все размеры и названия шрифтов на странице
+        # Размеры и шрифты спанов храним плоскими массивами номеров (в порядке появления значений),
+        # чтобы посчитать частоты одним np.bincount
+        all_size_ids = []
+        all_font_ids = []
+        size_ids = {}
+        font_ids = {}
+
+        text_blocks = []
+        block_texts = []
+        block_avg_sizes = []
+        block_dominant_ids = []
 
         for block in blocks:
             # Нужны текстовые блоки
             if block.get("type") != 0:
                 continue
+
+            # Соберём весь текст блока и все размеры шрифтов внутри, сохраняя переносы строк
+            block_font_sizes = []
+            line_texts = []
+            block_font_counts = {}
+
             for line in block["lines"]:
-                for span in line["spans"]:
-                    all_font_sizes.append(span["size"])
-                    all_font_names.append(span["font"])
-        if not all_font_sizes:
+                spans = line["spans"]
+                for span in spans:
+                    size = span["size"]
+                    font_id = font_ids.setdefault(span["font"], len(font_ids))
+                    block_font_sizes.append(size)
+                    block_font_counts[font_id] = block_font_counts.get(font_id, 0) + 1
+                    all_size_ids.append(size_ids.setdefault(size, len(size_ids)))
+                    all_font_ids.append(font_id)
+                # Собираем текст одной строки. Если содержания нет, возможно сбилась кодировка -
+                # перекодируем каждый спан здесь один раз, дальше работаем уже с готовым текстом
+                if flag_content:
+                    line_text = "".join([span["text"] for span in spans]).strip()
+                else:
+                    line_text = "".join([decode_cp1251(span["text"]) for span in spans]).strip()
+                line_texts.append(line_text)
+
+            text_blocks.append(block)
+            # Объединяем строки с \n — таким образом сохраняем переносы строк
+            block_texts.append("\n".join(line_texts))
+            # Средний размер шрифта в блоке и его основной шрифт
+            if block_font_sizes:
+                block_avg_sizes.append(sum(block_font_sizes) / len(block_font_sizes))
+                # max по словарю при равенстве берёт шрифт, встретившийся в блоке раньше
+                block_dominant_ids.append(max(block_font_counts, key=block_font_counts.get))
+            else:
+                block_avg_sizes.append(0.0)
+                block_dominant_ids.append(-1)
+
+        if not all_size_ids:
             # Нет текста на странице
             continue
 
-        # Определяем доминирующий размер шрифта
-        font_counter = Counter(all_font_sizes)
-        dominant_font_size = font_counter.most_common(1)[0][0]
+        # Определяем доминирующий размер шрифта (argmax при равенстве берёт встретившийся раньше).
+        # Часто на странице всего один размер и один шрифт - тогда и считать нечего
+        if len(size_ids) == 1:
+            dominant_font_size = next(iter(size_ids))
+        else:
+            dominant_font_size = list(size_ids)[np.bincount(all_size_ids).argmax()]
 
         # Определяем доминирующий шрифт
-        font_name_counter = Counter(all_font_names)
-        dominant_font_name = font_name_counter.most_common(1)[0][0]
+        if len(font_ids) == 1:
+            dominant_font_id = 0
+        else:
+            dominant_font_id = np.bincount(all_font_ids).argmax()
+
+        # Числовые признаки считаем сразу для всех блоков страницы:
+        # отличие шрифта от доминирующего и «узость» блока (колонки, подписи под изображениями в колонках)
+        bboxes = np.array([block["bbox"] for block in text_blocks], dtype=np.float64)
+        font_mismatch = (np.abs(np.array(block_avg_sizes) - dominant_font_size) > FONT_SIZE_DIFF_THRESHOLD) | \
+            (np.array(block_dominant_ids) != dominant_font_id)
+        narrow = (bboxes[:, 2] - bboxes[:, 0]) < min_block_width
 
         # Фильтруем блоки: по размеру текста, шрифту, ширине и «центрированности» (подписи)
         prelim_blocks = []
-        for block in blocks:
-            if block.get("type") != 0:
-                continue
-
-            # Соберём весь текст блока и все размеры шрифтов внутри, сохраняя переносы строк
-            block_font_sizes = []
-            line_texts = []
-            block_font_names = []
-
-            for line in block["lines"]:
-                span_texts = []
-                for span in line["spans"]:
-                    block_font_sizes.append(span["size"])
-                    block_font_names.append(span["font"])
-                    # Если содержания нет, возможно сбилась кодировка
-                    if not flag_content:
-                        raw_text = span["text"]
-                        try:
-                            # Пытаемся перекодировать из Latin-1 -> CP1251
-                            span_text = raw_text.encode("latin-1").decode("cp1251", errors="ignore")
-                        except Exception:
-                            # Если по какой-то причине не получилось — оставляем как есть
-                            span_text = raw_text
-                    else:
-                        span_text = span["text"]
-                    span_texts.append(span_text)
-                # Собираем текст одной строки
-                line_text = "".join(span_texts).strip()
-                line_texts.append(line_text)
-            # Объединяем строки с \n — таким образом сохраняем переносы строк
-            total_text = "\n".join(line_texts)
+        for i, block in enumerate(text_blocks):
+            total_text = block_texts[i]
 
             x0, y0, x1, y1 = block["bbox"]
 
@@ -511,26 +669,15 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
                 continue
 
             # русский текст
-            chars = [ch for ch in total_text if ch.isalpha()]
-            if chars:
-                cyrillic_count = sum(1 for ch in chars if "А" <= ch <= "я" or ch in "Ёё")
-                if cyrillic_count / len(chars) < MIN_CYRILLIC_RATIO:
-                    continue
-
-            # Длины без учёта переносов
-            first_line = total_text.split("\n", 1)[0].lstrip()
-            last_line = total_text.split("\n")[-1].strip()
-
-            cnt_open = total_text.count("(")
-            cnt_close = total_text.count(")")
+            ratio = cyrillic_ratio(total_text)
+            if ratio is not None and ratio < MIN_CYRILLIC_RATIO:
+                continue
 
-            # Если вдруг скобка одна, то скорее всего продолжение
-            # в следующей строке и такие блоки лучше не фильтровать
-            single_bracket = (cnt_open + cnt_close == 1)
+            first_line, last_line, plain_len, single_bracket, ends_with_hyphen = block_stats(total_text)
 
             # Отсеиваем очень короткие блоки
-            if len(total_text.replace("\n", "").strip()) < MIN_BLOCK_CHARS:
-                if not LIST_START_PATTERN.match(first_line) and not last_line.endswith(":")\
+            if plain_len < MIN_BLOCK_CHARS:
+                if not is_list_start(first_line) and not last_line.endswith(":")\
                         and not single_bracket:
                     continue
 
@@ -538,21 +685,15 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
             if first_line.startswith("рис."):
                 continue
 
-            # Средний размер шрифта в блоке
-            avg_block_font_size = sum(block_font_sizes) / len(block_font_sizes)
-            block_name_counter = Counter(block_font_names)
-            block_dominant_name = block_name_counter.most_common(1)[0][0]
-            if (abs(avg_block_font_size - dominant_font_size) > FONT_SIZE_DIFF_THRESHOLD
-                    or block_dominant_name != dominant_font_name):
+            # Шрифт отличается от основного
+            if font_mismatch[i]:
                 # Части листов лучше сразу не отбрасывать
-                if not LIST_START_PATTERN.match(first_line):
+                if not is_list_start(first_line):
                     continue
 
-            # Отсеиваем узкие блоки (часто колонки, подписи под изображениями в колонках)
-            x0, y0, x1, y1 = block["bbox"]
-            block_width = x1 - x0
-            if block_width < MIN_BLOCK_WIDTH_RATIO * page_width:
-                if not LIST_START_PATTERN.match(first_line) and not last_line.endswith(":") and not single_bracket:
+            # Отсеиваем узкие блоки
+            if narrow[i]:
+                if not is_list_start(first_line) and not last_line.endswith(":") and not single_bracket:
                     # print(total_text, 'узкие')
                     continue
 
@@ -561,77 +702,59 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
                 "text": total_text
             })
 
-            prev_ended_with_hyphen = total_text.strip().endswith('-') or total_text.strip().endswith('-')
+            prev_ended_with_hyphen = ends_with_hyphen
 
         if not prelim_blocks:
             continue
 
-        # Определяем медианный вертикальный зазор между блоками для фильтрации подписей
-        sorted_prelim = sorted(prelim_blocks, key=lambda b: b["bbox"][1])
-        gaps = []
-        for i in range(1, len(sorted_prelim)):
-            prev_y1 = sorted_prelim[i - 1]["bbox"][3]
-            curr_y0 = sorted_prelim[i]["bbox"][1]
-            gaps.append(max(0, int(curr_y0) - int(prev_y1)))
-        median_gap = median(gaps) if gaps else 0
-
-        # Окончательная фильтрация
-        filtered_blocks = []
-        for i, tb in enumerate(sorted_prelim):
-            total_text = tb["text"]
-            x0, y0, x1, y1 = tb["bbox"]
-            plain_len = len(total_text.replace("\n", "").strip())
+        # Упорядочиваем блоки сверху вниз. PyMuPDF почти всегда отдаёт их уже в таком порядке,
+        # поэтому сортируем (устойчиво) только если порядок нарушен
+        prelim_bboxes = np.array([b["bbox"] for b in prelim_blocks], dtype=np.float64)
+        if np.any(np.diff(prelim_bboxes[:, 1]) < 0):
+            order = np.argsort(prelim_bboxes[:, 1], kind="stable")
+            prelim_blocks = [prelim_blocks[i] for i in order]
+            prelim_bboxes = prelim_bboxes[order]
 
-            block_center_x = (x0 + x1) / 2
-            page_center_x = page_width / 2
-            gap_to_prev = 0
-            if i > 0:
-                prev_y1 = sorted_prelim[i - 1]["bbox"][3]
-                gap_to_prev = max(0, y0 - prev_y1)
+        # Определяем медианный вертикальный зазор между блоками для фильтрации подписей.
+        # Координаты отбрасываем до целых (как int()), сам медианный зазор может быть дробным
+        gaps = np.maximum(0, prelim_bboxes[1:, 1].astype(np.int64) - prelim_bboxes[:-1, 3].astype(np.int64))
+        median_gap = np.median(gaps) if gaps.size else 0
+        gap_threshold = GAP_MULTIPLIER * median_gap
 
-            # Вычисляем центрированность блока
-            is_centered = abs(block_center_x - page_center_x) < CENTER_TOLERANCE_RATIO * page_width
+        # Формируем абзацы из отфильтрованных блоков, склеивая незаконченные предложения.
+        page_paragraphs = []
+        temp_para = carryover
+        prev_ended_with_hyphen = False
+
+        # Подписи отбрасываем прямо здесь: зазор считаем до предыдущего блока до фильтрации
+        prev_y1 = None
+
+        for blk in prelim_blocks:
+            # Текст уже перекодирован при сборе блока
+            blk_text = blk["text"]
+
+            x0, y0, x1, _ = blk["bbox"]
+            gap_to_prev = max(0, y0 - prev_y1) if prev_y1 is not None else 0
+            prev_y1 = blk["bbox"][3]
 
-            # Вычисляем есть ли числа с точкой внутри
-            has_num_dot_inside = bool(re.search(r"\d+\.", total_text)) and not total_text.strip().endswith(".")
+            # Вычисляем центрированность блока
+            block_center_x = (x0 + x1) / 2
+            is_centered = abs(block_center_x - page_center_x) < center_tolerance
 
             # Условие «подписи»:
             #  - одна линия,
             #  - длина <= CAPTION_MAX_CHARS,
             #  - центрирован,
             #  - gap_to_prev > GAP_MULTIPLIER * median_gap,
-            #  - внутри есть «число.»
-            if ("\n" not in total_text
-                    and plain_len <= CAPTION_MAX_CHARS
+            #  - внутри есть «число.» (и блок не заканчивается точкой)
+            if ("\n" not in blk_text
                     and is_centered
-                    and gap_to_prev > GAP_MULTIPLIER * median_gap
-                    and has_num_dot_inside):
+                    and gap_to_prev > gap_threshold
+                    and len(blk_text.strip()) <= CAPTION_MAX_CHARS
+                    and not blk_text.strip().endswith(".")
+                    and RE_NUM_DOT.search(blk_text)):
                 continue
 
-            filtered_blocks.append(tb)
-
-        # Формируем абзацы из отфильтрованных блоков, склеивая незаконченные предложения.
-        page_paragraphs = []
-        temp_para = carryover
-        prev_ended_with_hyphen = False
-        page_center_x = page_width / 2
-
-        for blk in filtered_blocks:
-            if not flag_content:
-                raw_text = blk["text"]
-                try:
-                    # Пытаемся «перекодировать» из Latin-1 → CP1251
-                    blk_text = raw_text.encode("latin-1").decode("cp1251", errors="ignore")
-                except Exception:
-                    # Если по какой-то причине не получилось — оставляем как есть
-                    blk_text = raw_text
-            else:
-                blk_text = blk["text"]
-
-            x0, _, x1, _ = blk["bbox"]
-            block_center_x = (x0 + x1) / 2
-            is_centered = abs(block_center_x - page_center_x) < CENTER_TOLERANCE_RATIO * page_width
-
             # Если предыдущий блок заканчивался дефисом, и текущий не центрирован,
             # то просто берём весь следующий блок целиком в temp_para
             if prev_ended_with_hyphen and not is_centered:
@@ -650,7 +773,7 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
             first_line = blk_text.split("\n", 1)[0].lstrip()
             if first_line.startswith('-') or first_line.startswith('•'):
                 # Сначала, если temp_para уже заканчивается на точку/?/!
-                if temp_para and sentence_endings.search(temp_para):
+                if temp_para and RE_SENT_END.search(temp_para):
                     page_paragraphs.append(temp_para)
                     temp_para = ""
                 # Добавляем сам буллет-абзац (с переносами внутри, если они были)
@@ -665,7 +788,7 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
 
             # Проверяем, заканчивается ли на точку/?/!
             last_line = candidate.split("\n")[-1]
-            if sentence_endings.search(last_line.strip()):
+            if RE_SENT_END.search(last_line.strip()):
                 # Завершённый абзац
                 page_paragraphs.append(candidate)
                 temp_para = ""
@@ -687,115 +810,125 @@ def extract_paragraphs_from_pages(pdf_path: Path, page_numbers: list[int], flag_
     return paragraphs
 
 
-def find_section_range(doc, section_title: str, flag_content=True):
+@functools.lru_cache(maxsize=None)
+def section_patterns(section_title: str):
     """
-    Находим диапазон для "Введения" в случае если содержания найти не удается, либо не получается его спарсить.
-    Для этого ищем среди потенциальных заголовков.
+    Компилируем шаблоны для поиска заголовка раздела один раз на название.
 
-    :param doc: Сам документ.
-    :param section_title: Название раздела, который требуется найти.
-    :param flag_content: Флаг наличия содержания
-    :return:
+    :param section_title: Название раздела.
+    :return: Шаблон самого названия и шаблон названия с номером раздела перед ним.
     """
-    # Регулярное выражение для заголовка с номером раздела перед именем
-    heading_with_number = re.compile(r'\b\d+(\.\d+)*\s*' + re.escape(section_title), re.IGNORECASE)
+    escaped = re.escape(section_title)
+    return re.compile(escaped, re.IGNORECASE), re.compile(r'\b\d+(\.\d+)*\s*' + escaped, re.IGNORECASE)
 
-    total_pages = doc.page_count
 
-    page_found = None
+def iter_text_spans(text_dict: dict):
+    """
+    Перебираем все спаны текстовых блоков страницы.
+
+    :param text_dict: Результат page.get_text("dict").
+    :return: Генератор спанов.
+    """
+    for block in text_dict["blocks"]:
+        # пропускаем не текстовые блоки
+        if block["type"] != 0:
+            continue
+        for line in block["lines"]:
+            yield from line["spans"]
 
-    # Найдем страницу, где впервые встречается section_title как заголовок
-    for zero_based_page in range(total_pages):
-        page = doc.load_page(zero_based_page)
-        # Получаем всю текстовую структуру страницы в виде dict, чтобы вытащить спаны с информацией о шрифте
-        text_dict = page.get_text("dict")
-        for block in text_dict["blocks"]:
-            # пропускаем не текстовые блоки
-            if block["type"] != 0:
-                continue
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    raw_text = span["text"]
-                    try:
-                        # Пытаемся «перекодировать» из Latin-1 → CP1251
-                        span_text = raw_text.encode("latin-1").decode("cp1251", errors="ignore")
-                    except Exception:
-                        # Если по какой-то причине не получилось — оставляем как есть
-                        span_text = raw_text
-
-                    span_font = span["font"]
-
-                    # Проверяем, найдено ли ключевое слово section_title
-                    if re.search(re.escape(section_title), span_text.lower(), re.IGNORECASE):
-                        # Если шрифт жирный
-                        if "bold" in span_font.lower() or "f44" in span_font.lower():
-                            page_found = zero_based_page
-                            break
-                        # Или перед заголовком стоит номер раздела
-                        if heading_with_number.search(span_text):
-                            page_found = zero_based_page
-                            break
-                if page_found is not None:
-                    break
-            if page_found is not None:
-                break
-        if page_found is not None:
-            if flag_content:
-                flag_content = False
-                continue
-            break
 
-    if page_found is None:
-        raise ValueError(f"Заголовок «{section_title}» не найден ни в одном жирном спане и без номера раздела")
+def section_not_found(section_title: str) -> ValueError:
+    """
+    Ошибка для раздела, который не нашёлся среди заголовков.
 
-    # Найдем первую страницу после page_found, где появляется любой следующий заголовок
-    next_heading_page = None
+    :param section_title: Название раздела.
+    :return: Исключение с сообщением.
+    """
+    return ValueError(f"Заголовок «{section_title}» не найден ни в одном жирном спане и без номера раздела")
 
-    # Регулярное выражение для любого нового заголовка с номером раздела в начале строки
-    any_heading_pattern = re.compile(r'^\s*\d+(\.\d+)*\[а-яА-я]+\b')
 
-    for zero_based_page in range(page_found + 1, total_pages):
+def find_section_ranges(doc, section_titles: list[str]) -> dict:
+    """
+    Находим диапазоны разделов в случае если содержания найти не удается, либо не получается его спарсить.
+    Для этого ищем среди потенциальных заголовков, причём все разделы сразу - за один проход по документу.
+
+    :param doc: Сам документ.
+    :param section_titles: Названия разделов, которые требуется найти.
+    :return: Словарь название -> (первая страница, последняя страница или None). Ненайденных разделов в нём нет.
+    """
+    # Регулярные выражения для самого заголовка и для заголовка с номером раздела перед именем
+    patterns = {title: section_patterns(title) for title in section_titles}
+
+    # Первая страница, где section_title встречается как заголовок
+    starts = {}
+    # Страницы, на которых есть хоть какой-то заголовок
+    heading_pages = []
+
+    for zero_based_page in range(doc.page_count):
         page = doc.load_page(zero_based_page)
-        text_dict = page.get_text("dict")
+        # Получаем всю текстовую структуру страницы в виде dict, чтобы вытащить спаны с информацией о шрифте
+        text_dict = page.get_text("dict", flags=TEXT_FLAGS)
+
+        pending = [title for title in section_titles if title not in starts]
         found_heading_here = False
 
-        for block in text_dict["blocks"]:
-            if block["type"] != 0:
-                continue
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    raw_text = span["text"]
-                    try:
-                        # Пытаемся «перекодировать» из Latin-1 → CP1251
-                        span_text = raw_text.encode("latin-1").decode("cp1251", errors="ignore")
-                    except Exception:
-                        # Если по какой-то причине не получилось - оставляем как есть
-                        span_text = raw_text
-                    span_font = span["font"]
-                    # Если шрифт жирный - принимаем это за заголовок любого уровня
-                    if "bold" in span_font.lower() or "f44" in span_font.lower():
-                        next_heading_page = zero_based_page
-                        found_heading_here = True
-                        break
-                    # Или перед заголовком стоит номер раздела
-                    if any_heading_pattern.match(span_text):
-                        next_heading_page = zero_based_page
-                        found_heading_here = True
-                        print(span_text)
-                        break
-                if found_heading_here:
+        for span in iter_text_spans(text_dict):
+            span_text = decode_cp1251(span["text"])
+            span_font = span["font"].lower()
+            is_bold = "bold" in span_font or "f44" in span_font
+
+            # Если шрифт жирный - принимаем это за заголовок любого уровня
+            if not found_heading_here:
+                if is_bold:
+                    found_heading_here = True
+                # Или перед заголовком стоит номер раздела
+                elif RE_ANY_HEADING.match(span_text):
+                    print(span_text)
+                    found_heading_here = True
+
+            for title in pending:
+                title_pattern, heading_with_number = patterns[title]
+                # Проверяем, найдено ли ключевое слово section_title: шрифт жирный или перед ним номер раздела
+                if title_pattern.search(span_text.lower()) and (is_bold or heading_with_number.search(span_text)):
+                    starts[title] = zero_based_page
+                    pending = [t for t in pending if t != title]
                     break
-            if found_heading_here:
+
+            if found_heading_here and not pending:
                 break
+
         if found_heading_here:
+            heading_pages.append(zero_based_page)
+
+        # Все разделы найдены и после последнего из них уже есть следующий заголовок
+        if len(starts) == len(section_titles) and heading_pages[-1:] and heading_pages[-1] > max(starts.values()):
             break
 
-    if next_heading_page is not None:
-        end_page = next_heading_page - 1
-    else:
-        end_page = None
+    # Конец раздела - страница перед первой страницей с любым следующим заголовком
+    ranges = {}
+    for title, page_found in starts.items():
+        next_heading_page = next((p for p in heading_pages if p > page_found), None)
+        ranges[title] = (page_found, next_heading_page - 1 if next_heading_page is not None else None)
+
+    return ranges
+
+
+def parse_doc(doc):
+    """
+    Парсинг уже открытого документа.
 
-    return page_found, end_page
+    :param doc: Сам документ.
+    :return: Заголовки искомых разделов (1 или 2), лист с блоками текста "Введения", лист с блоками текста "Обзора"
+    """
+    review_paragraphs = None
+
+    titles, intro_pages, review_pages, flag_content, flag_review = get_pages_for_parsing(doc)
+    intro_paragraphs = extract_paragraphs_from_pages(doc, intro_pages, flag_content)
+
+    if flag_review:
+        review_paragraphs = extract_paragraphs_from_pages(doc, review_pages, flag_content)
+
+    return titles, intro_paragraphs, review_paragraphs
 
 
 def parse(pdf_name: str):
@@ -807,14 +940,19 @@ def parse(pdf_name: str):
     """
     print(f"******* {str(pdf_name)} **********")
 
-    doc = fitz.open(pdf_name)
-    review_paragraphs = None
+    with fitz.open(pdf_name) as doc:
+        return parse_doc(doc)
 
-    titles, intro_pages, review_pages, flag_content, flag_review = get_pages_for_parsing(doc)
-    intro_paragraphs = extract_paragraphs_from_pages(Path(pdf_name), intro_pages, flag_content)
 
-    if flag_review:
-        review_paragraphs = extract_paragraphs_from_pages(Path(pdf_name), review_pages, flag_content)
+def parse_bytes(data: bytes, name: str = "<stream>"):
+    """
+    То же, что и parse, но pdf уже загружен в память (например, скачан) и не пишется на диск.
 
-    return titles, intro_paragraphs, review_paragraphs
+    :param data: Содержимое pdf файла.
+    :param name: Имя документа для логов.
+    :return: Заголовки искомых разделов (1 или 2), лист с блоками текста "Введения", лист с блоками текста "Обзора"
+    """
+    print(f"******* {name} **********")
 
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return parse_doc(doc)
@@ -9,16 +9,22 @@
 """
 
 import time
+import shutil
 from pathlib import Path
+from urllib.parse import urljoin
 import requests
+import lxml.html
+from lxml import etree
+from lxml.cssselect import CSSSelector
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from parser_pdf import parse
-import json
+import orjson
 import hashlib
+import functools
 import traceback
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
@@ -27,8 +33,24 @@ PARAMS = "search=&supervisor=0&course=0&startdate=2007&enddate=2022&worktype=1"
 URL = f"{BASE}/theses.html?{PARAMS}"
 HEAD = {"User-Agent": "Mozilla/5.0"}
 
+# Элементы списка работ и их поля (XPath относительно работы), компилируем один раз
+SEL_ENTRY = CSSSelector("#ThesisList > div")
+XP_TITLE = etree.XPath(".//div/div/div[1]/h6/strong")
+XP_PDF_LINK = etree.XPath(".//div/div/div[2]/a[1]")
+XP_TOPIC = etree.XPath(".//div[2]/p[3]/i")
+
+# Блочные элементы (между ними браузер переносит строку) и невидимые элементы для text_of
+BLOCK_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset", "figcaption",
+    "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main",
+    "nav", "ol", "p", "pre", "section", "table", "tr", "ul",
+))
+HIDDEN_TAGS = frozenset(("script", "style", "noscript", "template", "head"))
+
 # куда сохранять json и pdf (необработанные pdf сохраняются для ручного просмотра и отладки)
 OUT = Path("downloads")
+# размер куска при записи скачиваемого pdf на диск
+CHUNK_SIZE = 256 * 1024
 
 
 def download(session, href: str, title: str, topic: str):
@@ -38,33 +60,36 @@ def download(session, href: str, title: str, topic: str):
     OUT.mkdir(exist_ok=True)
 
     id = href[href.find('=')+1:]
-    fn = OUT/f"{get_md5_hash(title)}.pdf"
-    fnj = OUT/f"{get_md5_hash(title)}.json"
+    digest = get_md5_hash(title)
+    fn = OUT/f"{digest}.pdf"
+    fnj = OUT/f"{digest}.json"
 
     if fnj.exists():
         print(f"[✓] Уже обработан: {fn.name}")
         return
     if fn.exists():
         print(f"[.] Уже скачан, обработаем: {fn.name}")
-        process_pdf(fn, title, topic, id)
+        process_pdf(fn, title, topic, id, digest)
         return
 
     print(f"[↓] {title}")
     r = session.get(href, stream=True, headers=HEAD, timeout=30)
     r.raise_for_status()
 
+    # Копируем поток ответа в файл большими кусками (сжатие, если есть, снимает сам urllib3)
+    r.raw.decode_content = True
     with open(fn, "wb") as f:
-        for c in r.iter_content(8192):
-            f.write(c)
+        shutil.copyfileobj(r.raw, f, length=CHUNK_SIZE)
     print(f"[+] Сохранено: {fn.name}")
 
-    process_pdf(fn, title, topic, id)
+    process_pdf(fn, title, topic, id, digest)
 
 
-def process_pdf(pdf_path: Path, title: str, topic: str, id: str):
+def process_pdf(pdf_path: Path, title: str, topic: str, id: str, digest: str = None):
     """
     Вызывает обработку pdf и затем удаляет файл.
     Возвращает в качестве результата блоки двух разделов.
+    digest - уже посчитанный хэш заголовка (если None, посчитаем в save_json).
     """
     try:
         data = parse(pdf_path)
@@ -74,7 +99,7 @@ def process_pdf(pdf_path: Path, title: str, topic: str, id: str):
         print("Не удалось обработать")
         return
 
-    save_json(data, title, topic, id)
+    save_json(data, title, topic, id, digest)
 
     try:
         pdf_path.unlink()
@@ -84,9 +109,10 @@ def process_pdf(pdf_path: Path, title: str, topic: str, id: str):
     return data
 
 
-def save_json(data, title: str, topic: str, id: str):
+def save_json(data, title: str, topic: str, id: str, digest: str = None):
     """
     Сохраняем в виде json полученные данные.
+    Имя файла - хэш заголовка, digest передаётся из download, чтобы не считать его повторно.
     """
     if not data:
         return
@@ -96,7 +122,7 @@ def save_json(data, title: str, topic: str, id: str):
     if not intro_pages:
         return
 
-    fnj = OUT / f"{get_md5_hash(title)}.json"
+    fnj = OUT / f"{digest or get_md5_hash(title)}.json"
     title, year = title[:-6], title[-6:]
 
     # Если у нас есть раздел "Обзор" или похожий
@@ -119,35 +145,89 @@ def save_json(data, title: str, topic: str, id: str):
             titles[0]: intro_pages
         }
 
-    with open(fnj, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    fnj.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
     return
 
 
+@functools.lru_cache(maxsize=4096)
 def get_md5_hash(header: str) -> str:
     """
     Возвращает MD5-хэш от строки.
-    Результат между запусками интерпретатора будет одинаков.
+    Результат между запусками интерпретатора будет одинаков, повторные вызовы берутся из кеша.
+    Хэш нужен только для имён файлов, поэтому помечаем его как не криптографический
+    (на FIPS-сборках обычный md5 запрещён). Алгоритм не меняем: по этим именам
+    parser_hse и parser_abstract находят уже сохранённые работы.
     """
     # Переводим строку в байты. Кодируем в UTF-8.
     header_bytes = header.encode('utf-8')
     # Вычисляем MD5
-    md5_obj = hashlib.md5(header_bytes)
+    md5_obj = hashlib.md5(header_bytes, usedforsecurity=False)
     # Получаем шестнадцатеричное представление
     return md5_obj.hexdigest()
 
 
+def collect_text(node, parts: list):
+    """
+    Рекурсивно собираем текст узла lxml, ставя перевод строки на <br> и на границах блочных элементов.
+    Переводы строк из самой разметки, как и браузер, считаем обычными пробелами.
+
+    :param node: Узел дерева.
+    :param parts: Куда складываем куски текста.
+    """
+    tag = node.tag if isinstance(node.tag, str) else None
+    # комментарии и скрипты браузер не показывает
+    if tag is None or tag in HIDDEN_TAGS:
+        return
+    if tag == "br":
+        parts.append("\n")
+        return
+
+    block = tag in BLOCK_TAGS
+    if block:
+        parts.append("\n")
+    if node.text:
+        parts.append(node.text.replace("\n", " "))
+    for child in node:
+        collect_text(child, parts)
+        if child.tail:
+            parts.append(child.tail.replace("\n", " "))
+    if block:
+        parts.append("\n")
+
+
+def text_of(el) -> str:
+    """
+    Текст элемента так, как его показывает браузер (как .text в selenium):
+    пробелы внутри строки сжимаются, переводы строк между блоками и на <br> сохраняются.
+    """
+    parts = []
+    collect_text(el, parts)
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def headless_options() -> Options:
+    """
+    Настройки headless Chrome: страница считается загруженной сразу после построения DOM,
+    картинки не загружаются (нам нужен только текст и ссылки).
+    """
+    opts = Options()
+    opts.add_argument("--headless")
+    opts.add_argument("--disable-gpu")
+    opts.add_argument("--window-size=1920,1080")
+    opts.page_load_strategy = "eager"
+    opts.add_argument("--blink-settings=imagesEnabled=false")
+    opts.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return opts
+
+
 def main():
     # сессия requests для PDF
     sess = requests.Session()
     sess.headers.update(HEAD)
 
     # selenium
-    opts = Options()
-    opts.add_argument("--headless")
-    opts.add_argument("--disable-gpu")
-    driver = webdriver.Chrome(options=opts)
-    opts.add_argument("--window-size=1920,1080")
+    driver = webdriver.Chrome(options=headless_options())
     driver.get(URL)
 
     # принять куки, если есть
@@ -156,7 +236,10 @@ def main():
             EC.element_to_be_clickable((By.CSS_SELECTOR, "button.acceptcookies"))
         )
         btn.click()
-        time.sleep(1)
+        # ждём, пока баннер с куки исчезнет
+        WebDriverWait(driver, 3).until(
+            EC.invisibility_of_element_located((By.CSS_SELECTOR, "button.acceptcookies"))
+        )
     except:
         pass
 
@@ -170,46 +253,36 @@ def main():
             WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "#ThesisList > div"))
             )
+            # Забираем html страницы один раз и дальше разбираем его локально,
+            # а не ходим в браузер за каждым элементом каждой работы
+            tree = lxml.html.fromstring(driver.page_source)
+
             # все прямые дочки #ThesisList — по ним и пройдём
-            entries = driver.find_elements(By.CSS_SELECTOR, "#ThesisList > div")
+            entries = SEL_ENTRY(tree)
             if not entries:
                 print("[!] Нет записей в #ThesisList, выходим.")
                 break
 
             for entry in entries:
                 # ищем заголовок по full XPath (можно посмотреть в коде сайта), но относительно entry
-                try:
-                    title_el = entry.find_element(
-                        By.XPATH,
-                        ".//div/div/div[1]/h6/strong"
-                    )
-                    title = title_el.text.strip()
-                except:
+                title_els = XP_TITLE(entry)
+                if not title_els:
                     print("[!] Не удалось найти заголовок в entry, пропускаем.")
                     continue
+                title = text_of(title_els[0])
 
                 # ищем ссылку на pdf по full XPath внутри entry
-                try:
-                    a = entry.find_element(
-                        By.XPATH,
-                        ".//div/div/div[2]/a[1]"
-
-                    )
-                    href = a.get_attribute("href")
-                    if not href.startswith("http"):
-                        href = BASE + href
-                except:
+                links = XP_PDF_LINK(entry)
+                if not links or not links[0].get("href"):
                     print(f"[!] PDF не найден для «{title}»")
                     continue
+                href = urljoin(page_url, links[0].get("href"))
 
                 # ищем тему (название направления/кафедры) по full XPath внутри entry
-                try:
-                    topic_el = entry.find_element(
-                        By.XPATH,
-                        ".//div[2]/p[3]/i"
-                    )
-                    topic = topic_el.text.strip()
-                except:
+                topic_els = XP_TOPIC(entry)
+                if topic_els:
+                    topic = text_of(topic_els[0])
+                else:
                     print(f"[!] Topic не найден для «{title}»")
                     topic = None
 
@@ -1,19 +1,27 @@
 """
 Id-парсер pdf c сайта кафедры Системного программирования СПбГУ (2007–2024).
 — Принимает куки
-— Переходит на страницы с необработанными id и скачивает pdf.
+— Переходит на страницы с необработанными id и параллельно скачивает pdf.
 — Обрабатывает pdf в модулях parser_pdf.py и parser_diploma.py (парсит текст и титульник).
 """
 
-import requests
 import os
-import time
 import sys
-import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+import orjson
+
 import parser_web
 import parser_diploma
 from pathlib import Path
 
+# сколько pdf скачиваем одновременно
+MAX_CONCURRENCY = 8
+# как часто (раз в сколько новых id) сбрасываем processed_ids.json на диск
+SAVE_EVERY = 50
+
 
 def load_processed_ids(json_path: str) -> set:
     """
@@ -22,10 +30,10 @@ def load_processed_ids(json_path: str) -> set:
     if not os.path.exists(json_path):
         return set()
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(json_path, "rb") as f:
+            data = orjson.loads(f.read())
         return set(data)
-    except (json.JSONDecodeError, IOError):
+    except (orjson.JSONDecodeError, IOError):
         print(f"[!] Не удалось прочитать {json_path}, начинаем с пустого списка.")
         return set()
 
@@ -33,9 +41,10 @@ def load_processed_ids(json_path: str) -> set:
 def save_processed_ids(processed: set, json_path: str):
     """
     Сохраняет множество processed в JSON-файл (списком).
+    Файл служебный и переписывается по ходу обхода, поэтому пишем без отступов.
     """
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(sorted(processed), f, ensure_ascii=False, indent=2)
+    with open(json_path, "wb") as f:
+        f.write(orjson.dumps(sorted(processed)))
 
 
 def process_pdf(file_path: str, id: str):
@@ -50,73 +59,134 @@ def process_pdf(file_path: str, id: str):
     parser_web.process_pdf(Path(file_path), title, topic, id)
 
 
-def download_and_process(start_id: int,
-                         end_id: int,
-                         save_dir: str = "downloads",
-                         json_path: str = "processed_ids.json",
-                         delay: float = 0.5,
-                         max_retries=3):
+def make_client(max_concurrency: int, max_retries: int) -> httpx.AsyncClient:
+    """
+    Один http-клиент на весь диапазон: соединения с сайтом переиспользуются (keep-alive),
+    ошибки и таймауты соединения повторяет сам транспорт (с растущей паузой).
+
+    :param max_concurrency: Максимальное число одновременных соединений.
+    :param max_retries: Число повторов при ошибке соединения.
+    """
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=max_retries,
+        limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+    )
+    return httpx.AsyncClient(transport=transport, headers=parser_web.HEAD, follow_redirects=True, timeout=10)
+
+
+async def fetch_pdf(client: httpx.AsyncClient, thesis_id: int, save_dir: str):
+    """
+    Скачивает pdf одной работы. Запись на диск идёт в отдельном потоке,
+    чтобы не останавливать цикл событий (и остальные загрузки).
+
+    :param client: Http-клиент.
+    :param thesis_id: Id работы на сайте.
+    :param save_dir: Папка для pdf.
+    :return: Путь к скачанному pdf или None.
+    """
+    url = f"https://se.math.spbu.ru/thesis_download?thesis_id={thesis_id}"
+
+    try:
+        # Пишем pdf на диск по мере загрузки, не держа весь файл в памяти
+        async with client.stream("GET", url) as resp:
+            if resp.status_code == 200 and "pdf" in resp.headers.get("Content-Type", "").lower():
+                pdf_path = os.path.join(save_dir, f"{thesis_id}.pdf")
+                fout = await asyncio.to_thread(open, pdf_path, "wb")
+                try:
+                    async for chunk in resp.aiter_bytes(parser_web.CHUNK_SIZE):
+                        await asyncio.to_thread(fout.write, chunk)
+                finally:
+                    await asyncio.to_thread(fout.close)
+                print(f"[{thesis_id}] Скачан → {pdf_path}")
+                return pdf_path
+            print(f"[{thesis_id}] Нет PDF или статус {resp.status_code}")
+            return None
+
+    except httpx.HTTPError as e:
+        print(f"[{thesis_id}] Ошибка запроса: {e}")
+        return None
+
+
+async def process_id(client: httpx.AsyncClient, pool: ProcessPoolExecutor, thesis_id: int,
+                     save_dir: str, processed: set, json_path: str, delay: float):
+    """
+    Скачивает pdf, затем обрабатывает его в пуле процессов.
+    Любая ошибка остаётся в пределах своего id и не прерывает остальные.
+
+    :param client: Http-клиент.
+    :param pool: Пул процессов для разбора pdf.
+    :param thesis_id: Id работы на сайте.
+    :param save_dir: Папка для pdf.
+    :param processed: Множество обработанных id (пополняется).
+    :param json_path: Файл с обработанными id (сохраняется раз в SAVE_EVERY id).
+    :param delay: Пауза после загрузки (в секундах).
+    """
+    try:
+        pdf_path = await fetch_pdf(client, thesis_id, save_dir)
+        # Небольшая пауза, чтобы не перегружать сайт
+        await asyncio.sleep(delay)
+    except Exception as e:
+        print(f"[{thesis_id}] Ошибка при скачивании: {e}")
+        pdf_path = None
+
+    if pdf_path is None:
+        print(f"[{thesis_id}] Не удалось скачать, пропускаем.")
+        return
+
+    # Обработка
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(pool, process_pdf, pdf_path, str(thesis_id))
+        print(f"[{thesis_id}] Обработан успешно.")
+        processed.add(thesis_id)
+        # Файл переписывается целиком, поэтому сохраняем пачками, а не после каждого id
+        if len(processed) % SAVE_EVERY == 0:
+            save_processed_ids(processed, json_path)
+    except Exception as e:
+        print(f"[{thesis_id}] Ошибка в process_pdf: {e}")
+
+
+async def download_and_process(start_id: int,
+                               end_id: int,
+                               save_dir: str = "downloads",
+                               json_path: str = "processed_ids.json",
+                               delay: float = 0.5,
+                               max_retries=3,
+                               max_concurrency: int = MAX_CONCURRENCY):
     """
     Для каждого thesis_id в диапазоне:
       1) пропускает, если ID уже в processed_ids.json; иначе скачивает PDF;
       2) вызывает process_pdf;
       3) добавляет ID в JSON.
+    Id разбирают max_concurrency воркеров из общей очереди: пока одни ждут разбора pdf в пуле,
+    другие уже скачивают следующие.
     """
     os.makedirs(save_dir, exist_ok=True)
 
     processed = load_processed_ids(json_path)
 
+    todo = []
     for thesis_id in range(start_id, end_id + 1):
         if thesis_id in processed:
             print(f"[{thesis_id}] Уже обработан, пропускаем.")
             continue
+        todo.append(thesis_id)
 
-        url = f"https://se.math.spbu.ru/thesis_download?thesis_id={thesis_id}"
-        success = False
-        backoff = delay
+    # Общий итератор: каждый id достаётся ровно одному воркеру, корутины создаются по мере надобности
+    ids = iter(todo)
 
-        pdf_path = None
-        thesis_id = ""
-
-        # Пробуем скачать
-        for attempt in range(1, max_retries + 1):
-            try:
-                resp = requests.get(url, timeout=10)
-                if resp.status_code == 200 and "pdf" in resp.headers.get("Content-Type", "").lower():
-                    pdf_path = os.path.join(save_dir, f"{thesis_id}.pdf")
-                    with open(pdf_path, "wb") as fout:
-                        fout.write(resp.content)
-                    print(f"[{thesis_id}] Скачан → {pdf_path}")
-                    success = True
-                else:
-                    print(f"[{thesis_id}] Нет PDF или статус {resp.status_code}")
-                break
-
-            except requests.exceptions.ConnectTimeout as e:
-                print(f"[{thesis_id}] Попытка {attempt}/{max_retries}: таймаут соединения.")
-            except requests.RequestException as e:
-                print(f"[{thesis_id}] Ошибка запроса: {e}")
-                break
-
-            # задержка перед следующей попыткой
-            time.sleep(backoff)
-            backoff *= 2
-
-        if not success:
-            print(f"[{thesis_id}] Не удалось скачать после {max_retries} попыток, пропускаем.")
-            continue
+    async def worker(client: httpx.AsyncClient, pool: ProcessPoolExecutor):
+        for thesis_id in ids:
+            await process_id(client, pool, thesis_id, save_dir, processed, json_path, delay)
 
-        # Обработка
-        try:
-            process_pdf(pdf_path, thesis_id)
-            print(f"[{thesis_id}] Обработан успешно.")
-            processed.add(thesis_id)
-            save_processed_ids(processed, json_path)
-        except Exception as e:
-            print(f"[{thesis_id}] Ошибка в process_pdf: {e}")
-
-        # Небольшая пауза между ID
-        time.sleep(delay)
+    try:
+        with ProcessPoolExecutor() as pool:
+            async with make_client(max_concurrency, max_retries) as client:
+                await asyncio.gather(*(worker(client, pool) for _ in range(max_concurrency)))
+    finally:
+        # Досохраняем остаток (в том числе при прерывании)
+        save_processed_ids(processed, json_path)
 
 
 def main():
@@ -136,7 +206,7 @@ def main():
         print("Ошибка: start_id не может быть больше end_id.")
         sys.exit(1)
 
-    download_and_process(start_id, end_id)
+    asyncio.run(download_and_process(start_id, end_id))
 
 
 if __name__ == "__main__":
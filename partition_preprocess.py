@@ -2,11 +2,12 @@
 Обработка (чистка) текста и разделение на абзацы. Скип сломанных json.
 """
 import os
-import json
 import re
 import sys
 import argparse
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+import orjson
 from razdel import sentenize
 
 # Пороговые константы
@@ -26,11 +27,23 @@ RE_CAPTION = re.compile(r'^\s*(Рис\.|Табл\.)')
 RE_HEADING_NUM = re.compile(r'^\s*\d+(\.\d+)*\s+')
 RE_HEADING_WORD = re.compile(r'^[\sA-ZА-ЯЁ]{2,}$')
 RE_LIST_MARKER = re.compile(r'^\s*([-•]|\d+\.)\s*')
+# С чего может начинаться пункт списка (проверка до RE_LIST_MARKER)
+LIST_PREFIXES = frozenset('-•0123456789')
 RE_MULTI_DOTS = re.compile(r'\.{4,}')
 RE_SPACE_PUNCT = re.compile(r'([,;:.!?])([^\s])')
-RE_CONTROL_CHARS = re.compile(r'[\u0000-\u001F\u007F-\u009F]')
+RE_MANY_DOTS = re.compile(r'(\.\s*){7,}')
+RE_WHITESPACE = re.compile(r'\s+')
 VOWELS = set("аеёиоуыэюяAEЁИОУЫЭЮЯ")
 
+# Русские буквы: заглавные и таблица для удаления всех русских букв (остаток - не-кириллица)
+UPPER_CYR = "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+UPPER_CYR_SET = frozenset(UPPER_CYR)
+CYR_TABLE = str.maketrans('', '', UPPER_CYR + UPPER_CYR.lower())
+# Таблица для удаления цифр (по разнице длин считаем число цифр)
+DIGIT_TABLE = str.maketrans('', '', '0123456789')
+# Управляющие символы (C0 и C1) -> пробел
+CONTROL_TABLE = dict.fromkeys([*range(0x00, 0x20), *range(0x7F, 0xA0)], ' ')
+
 
 def normalize_unicode(text: str) -> str:
     return unicodedata.normalize('NFC', text)
@@ -46,17 +59,8 @@ def clean_raw_text(text: str) -> str:
     # Объединяем "-\n" -> ""
     text = text.replace('-\n', '')
 
-    # Заменяем \n -> пробел
-    text = text.replace('\n', ' ')
-
-    # \t и \u00A0 -> пробел
-    text = text.replace('\t', ' ').replace('\u00A0', ' ')
-
-    # Сжимаем подряд идущие пробелы
-    text = re.sub(r'\s+', ' ', text)
-
-    # Сжать пробелы повторно (на всякий случай)
-    text = re.sub(r' {2,}', ' ', text)
+    # \n, \t, \u00A0 и подряд идущие пробелы -> один пробел
+    text = RE_WHITESPACE.sub(' ', text)
 
     return text.strip()
 
@@ -86,7 +90,7 @@ def remove_artifacts(text: str) -> str:
     text = RE_MULTI_DOTS.sub('...', text)
 
     # убрать нечитаемые / контрольные символы
-    text = RE_CONTROL_CHARS.sub(' ', text)
+    text = text.translate(CONTROL_TABLE)
 
     return text.strip()
 
@@ -98,24 +102,23 @@ def sentence_filters(sent: str) -> bool:
     :param sent: Предложение.
     :return: Корректность полученного предложения (bool).
     """
+    stripped = sent.strip()
+
     # пустые
-    if not sent.strip():
+    if not stripped:
+        return False
+
+    # начинается заглавной русской буквы (самая дешёвая проверка, делаем первой)
+    if stripped[0] not in UPPER_CYR_SET:
         return False
 
-    # слишком короткие (< 3 слов)
-    if len(sent.split()) < MIN_SENT_WORDS:
+    # слишком короткие (< 3 слов): дальше MIN_SENT_WORDS слов не делим
+    if len(stripped.split(maxsplit=MIN_SENT_WORDS - 1)) < MIN_SENT_WORDS:
         return False
 
     # проверка не-Кириллицы
-    total = len(sent)
-    if total > 0:
-        non_cyr = sum(1 for c in sent if not re.match(r'[А-Яа-яЁё]', c))
-        if non_cyr / total > MAX_NON_CYRILLIC_RATIO:
-            return False
-
-    # начинается заглавной русской буквы
-    first = sent.strip()[0]
-    if not re.match(r'[А-ЯЁ]', first):
+    non_cyr = len(sent.translate(CYR_TABLE))
+    if non_cyr / len(sent) > MAX_NON_CYRILLIC_RATIO:
         return False
 
     return True
@@ -142,13 +145,14 @@ def clean_and_filter_block(block: str, is_last: bool = False) -> list:
     if not txt:
         return []
 
-    # Проверка на "много точек подряд" (знак того, что спарсилось введение)
-    if re.search(r'(\.\s*){7,}', txt):
+    # Проверка на "много точек подряд" (знак того, что спарсилось введение),
+    # регулярку запускаем только если точек вообще набирается 7
+    if txt.count('.') >= 7 and RE_MANY_DOTS.search(txt):
         return []
 
     # цифры составляют большую часть (знак того, что спарсилось введение)
-    digits = sum(1 for c in txt if c.isdigit())
-    if len(txt) > 0 and digits / len(txt) > DIGIT_RATIO_CHECK:
+    digits = len(txt) - len(txt.translate(DIGIT_TABLE))
+    if digits / len(txt) > DIGIT_RATIO_CHECK:
         return []
 
     # разбиваем на предложения и фильтруем
@@ -169,6 +173,31 @@ def clean_and_filter_block(block: str, is_last: bool = False) -> list:
     return dedup
 
 
+def split_at_middle_dot(text: str):
+    """
+    Делит текст на две части по первой точке после середины (точка остаётся в первой части).
+
+    :param text: Текст.
+    :return: Пара (part1, part2) или None, если после середины точки нет.
+    """
+    cut = text.find('.', len(text) // 2)
+    if cut == -1:
+        return None
+    return text[:cut + 1].strip(), text[cut + 1:].strip()
+
+
+def is_list_item(s: str) -> bool:
+    """
+    Является ли предложение пунктом списка. Регулярку запускаем только для строк,
+    первый символ которых может начинать маркер (или отступ), обычный текст отсекается сразу.
+
+    :param s: Предложение.
+    :return: True, если предложение начинается с маркера списка.
+    """
+    first = s[:1]
+    return (first in LIST_PREFIXES or first.isspace()) and RE_LIST_MARKER.match(s) is not None
+
+
 def handle_lists(sentences: list) -> list:
     """
     Склеиваем/Делим преложения из одного списка в один абзац либо фильтруем их.
@@ -180,10 +209,10 @@ def handle_lists(sentences: list) -> list:
     i = 0
     while i < len(sentences):
         s = sentences[i]
-        if RE_LIST_MARKER.match(s):
+        if is_list_item(s):
             items = []
             # добавляем в список пока есть маркеры списка
-            while i < len(sentences) and RE_LIST_MARKER.match(sentences[i]):
+            while i < len(sentences) and is_list_item(sentences[i]):
                 items.append(RE_LIST_MARKER.sub('', sentences[i]).strip())
                 i += 1
 
@@ -193,7 +222,7 @@ def handle_lists(sentences: list) -> list:
             else:
                 group = " ".join(items)
 
-            nospace_len = len(group.replace(" ", ""))
+            nospace_len = len(group) - group.count(" ")
 
             if not result and nospace_len < 300:
                 # нет предыдущего предложения и список слишком маленький – пропускаем
@@ -201,12 +230,9 @@ def handle_lists(sentences: list) -> list:
 
             if nospace_len > 800:
                 # разбиваем на два по точке около середины
-                mid = len(group)//2
-                cut = group.find('.', mid)
-                if cut != -1:
-                    part1 = group[:cut+1].strip()
-                    part2 = group[cut+1:].strip()
-                    result.extend([part1, part2])
+                parts = split_at_middle_dot(group)
+                if parts:
+                    result.extend(parts)
                 else:
                     result.append(group)
             else:
@@ -222,29 +248,29 @@ def split_paragraphs(sentences: list) -> list:
     Берёт список предложений, возвращает абзацы MIN_BLOCK_LEN–MAX_BLOCK_LEN
     символов без пробелов.
 
-    :param sentences: Список предложений.
+    :param sentences: Список предложений (уже без пробелов по краям).
     :return: Список абзацев.
     """
     paragraphs = []
-    buf = ""
+    # предложения текущего абзаца, склеиваем только при выгрузке
+    buf_parts = []
     buf_nospace = 0
 
     for s in sentences:
-        slen = len(s.replace(" ", ""))
+        slen = len(s) - s.count(" ")
         # слишком длинное предложение - разбиваем
         if slen > LARGE_BLOCK_LEN:
             # попытаемся найти точку около середины
-            mid = len(s) // 2
-            cut = s.find('.', mid)
-            if cut == -1:
+            parts = split_at_middle_dot(s)
+            if parts is None:
                 # нет точки — просто режем по символу
-                cut = mid
-            part1 = s[:cut + 1].strip()
-            part2 = s[cut + 1:].strip()
+                mid = len(s) // 2
+                parts = s[:mid + 1].strip(), s[mid + 1:].strip()
+            part1, part2 = parts
             # сбросим буфер
-            if buf:
-                paragraphs.append(buf)
-                buf, buf_nospace = "", 0
+            if buf_parts:
+                paragraphs.append(" ".join(buf_parts))
+                buf_parts, buf_nospace = [], 0
             # добавляем две части отдельно
             if part1:
                 paragraphs.append(part1)
@@ -254,19 +280,19 @@ def split_paragraphs(sentences: list) -> list:
 
         # добавляем абзацы
         if buf_nospace + slen <= MAX_BLOCK_LEN:
-            buf = (buf + " " + s).strip() if buf else s
+            buf_parts.append(s)
             buf_nospace += slen
-            if buf_nospace >= MIN_BLOCK_LEN and buf.endswith(('.', '!', '?')):
-                paragraphs.append(buf)
-                buf, buf_nospace = "", 0
+            if buf_nospace >= MIN_BLOCK_LEN and s.endswith(('.', '!', '?')):
+                paragraphs.append(" ".join(buf_parts))
+                buf_parts, buf_nospace = [], 0
         else:
-            if buf:
-                paragraphs.append(buf)
-            buf, buf_nospace = s, slen
+            if buf_parts:
+                paragraphs.append(" ".join(buf_parts))
+            buf_parts, buf_nospace = [s], slen
 
     # остаток буфера
-    if buf:
-        paragraphs.append(buf)
+    if buf_parts:
+        paragraphs.append(" ".join(buf_parts))
 
     return paragraphs
 
@@ -285,7 +311,7 @@ def get_meta(uni: str, data):
     return meta
 
 
-def process_file(path_in: str, path_out: str, uni: str):
+def process_file(path_in: str, path_out: str, uni: str, size: int = None):
     """
     Обрабатываем получившиеся json файлы, фильтруем мелкие и пораздельно фильтруем.
     После фильтрации текстов отбрасываем мелкие абзацы или фрагменты.
@@ -293,12 +319,15 @@ def process_file(path_in: str, path_out: str, uni: str):
     :param path_in: Папка с json.
     :param path_out: Папка, куда будут сохранены обработанные тексты.
     :param uni: Университет: {'hse', 'spbu'}.
+    :param size: Размер файла в байтах (если уже известен из os.scandir).
     """
+    if size is None:
+        size = os.path.getsize(path_in)
     # Пропустить мелкие файлы
-    if os.path.getsize(path_in) < MIN_FILE_SIZE:
+    if size < MIN_FILE_SIZE:
         return
-    with open(path_in, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(path_in, 'rb') as f:
+        data = orjson.loads(f.read())
     meta = get_meta(uni, data)
 
     # найти ключи, под которыми лежат тексты
@@ -323,7 +352,7 @@ def process_file(path_in: str, path_out: str, uni: str):
         paras = split_paragraphs(all_sents)
 
         # обрезаем короткие хвостовые абзацы
-        while paras and len(paras[-1].replace(" ", "")) < MIN_TRAILING_LEN:
+        while paras and len(paras[-1]) - paras[-1].count(" ") < MIN_TRAILING_LEN:
             paras.pop()
         if len(paras) < MIN_PARAGRAPH_COUNT:
             return
@@ -331,8 +360,23 @@ def process_file(path_in: str, path_out: str, uni: str):
 
     os.makedirs(os.path.dirname(path_out), exist_ok=True)
     if out:
-        with open(path_out, 'w', encoding='utf-8') as f:
-            json.dump(out, f, ensure_ascii=False, indent=2)
+        with open(path_out, 'wb') as f:
+            f.write(orjson.dumps(out, option=orjson.OPT_INDENT_2))
+
+
+def process_task(task: tuple):
+    """
+    Обрабатывает один файл в процессе пула, ошибку возвращает вместо исключения,
+    чтобы один сломанный json не останавливал остальные.
+
+    :param task: Кортеж (path_in, path_out, uni, size) - аргументы process_file.
+    :return: Текст ошибки или None.
+    """
+    try:
+        process_file(*task)
+    except Exception as e:
+        return str(e)
+    return None
 
 
 def main():
@@ -355,6 +399,12 @@ def main():
         required=True,
         help="Папка для сохранения результатов"
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count(),
+        help="Сколько файлов обрабатывать параллельно (по умолчанию - число ядер)"
+    )
     args = parser.parse_args()
 
     in_dir = args.in_dir
@@ -369,17 +419,23 @@ def main():
     # Создаем выходную папку, если её нет
     os.makedirs(out_dir, exist_ok=True)
 
-    # Обходим все файлы в папке
-    for fname in os.listdir(in_dir):
-        if not fname.lower().endswith('.json'):
-            continue
-        path_in = os.path.join(in_dir, fname)
-        path_out = os.path.join(out_dir, fname)
-        try:
-            process_file(path_in, path_out, uni)
-            print(f"[OK]  Обработан файл: {fname}")
-        except Exception as e:
-            print(f"[ERR] {fname}: {e}", file=sys.stderr)
+    # Обходим все файлы в папке. На Linux entry.stat() всё равно делает stat, но один раз здесь,
+    # а не повторно в process_file (имя и тип scandir отдаёт без syscall)
+    with os.scandir(in_dir) as it:
+        entries = [entry for entry in it if entry.name.lower().endswith('.json')]
+
+    tasks = [
+        (entry.path, os.path.join(out_dir, entry.name), uni, entry.stat().st_size)
+        for entry in entries
+    ]
+
+    # Файлы независимы, обрабатываем их параллельно в отдельных процессах
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        for entry, err in zip(entries, ex.map(process_task, tasks, chunksize=16)):
+            if err is None:
+                print(f"[OK]  Обработан файл: {entry.name}")
+            else:
+                print(f"[ERR] {entry.name}: {err}", file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -2,43 +2,44 @@
 Выбираем рандомно несколько файлов для ручного просмотра и поиска артефактов.
 """
 import os
-import json
 import random
 
+import orjson
+
 # Собираем файлы из папки
 downloads_folder = 'downloads'
-all_files = [f for f in os.listdir(downloads_folder) if f.endswith('.json')]
+with os.scandir(downloads_folder) as it:
+    all_files = {entry.name: entry.path for entry in it if entry.name.endswith('.json')}
 
-# Случайным образом выбираем 30 файлов
-selected_files = random.sample(all_files, 30)
+# Случайным образом выбираем 30 файлов (или все, если их меньше)
+selected_files = random.sample(list(all_files), min(30, len(all_files)))
 
 result = {}
 
 for filename in selected_files:
-    file_path = os.path.join(downloads_folder, filename)
+    file_path = all_files[filename]
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(file_path, 'rb') as f:
+        data = orjson.loads(f.read())
 
     # Получаем все ключи и берем два последних
-    keys = list(data.keys())
-    if len(keys) < 2:
+    last_two_keys = list(data)[-2:]
+    if len(last_two_keys) < 2:
         continue
-    last_two_keys = keys[-2:]
 
-    # Собираем первые 50 символов из первой строки каждого из двух списков
+    # Собираем первые 50 символов из первых двух строк каждого из двух списков
     extracted = {}
     for key in last_two_keys:
         value = data[key]
         if isinstance(value, list) and len(value) > 1 and isinstance(value[0], str):
-            extracted[key] = value[0][:150] + value[1][:150]
+            extracted[key] = value[0][:50] + value[1][:50]
         else:
             extracted[key] = None
 
     result[filename] = extracted
 
 output_file = '../result.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(result, f, ensure_ascii=False, indent=4)
+with open(output_file, 'wb') as f:
+    f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
 
 print(f"Готово. Результат в {output_file}")
@@ -3,10 +3,10 @@
 неработающих страниц).
 """
 import os
-import json
-import glob
 import sys
 
+import orjson
+
 
 def collect_ids_from_jsons(downloads_dir: str) -> set:
     """
@@ -14,11 +14,13 @@ def collect_ids_from_jsons(downloads_dir: str) -> set:
     извлекает из каждого значение поля "id" и возвращает множество этих ID.
     """
     ids = set()
-    pattern = os.path.join(downloads_dir, "*.json")
-    for path in glob.glob(pattern):
+    with os.scandir(downloads_dir) as it:
+        paths = [entry.path for entry in it if entry.name.endswith(".json")]
+
+    for path in paths:
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(path, "rb") as f:
+                data = orjson.loads(f.read())
 
             raw = data.get("id")
             if raw is None:
@@ -27,7 +29,7 @@ def collect_ids_from_jsons(downloads_dir: str) -> set:
             # Приводим к целому
             id_val = int(raw)
             ids.add(id_val)
-        except (json.JSONDecodeError, ValueError) as e:
+        except (orjson.JSONDecodeError, ValueError) as e:
             print(f"[!] Не удалось прочитать или преобразовать id в {os.path.basename(path)}: {e}")
         except IOError as e:
             print(f"[!] Ошибка ввода-вывода при открытии {os.path.basename(path)}: {e}")
@@ -37,11 +39,11 @@ def collect_ids_from_jsons(downloads_dir: str) -> set:
 
 def save_processed_ids(ids: set, output_path: str):
     """
-    Сохраняет отсортированный список ID в JSON-файл output_path.
+    Сохраняет отсортированный список ID в JSON-файл output_path (компактно, как parser_web_id).
     """
     sorted_ids = sorted(ids)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(sorted_ids, f, ensure_ascii=False, indent=2)
+    with open(output_path, "wb") as f:
+        f.write(orjson.dumps(sorted_ids))
 
     print(f"[✓] Сохранено {len(sorted_ids)} ID в {output_path}")
 
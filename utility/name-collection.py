@@ -5,7 +5,8 @@
 import os
 import sys
 import glob
-import json
+
+import orjson
 
 
 def save_json_filenames(input_dir: str, output_file: str):
@@ -21,8 +22,8 @@ def save_json_filenames(input_dir: str, output_file: str):
     filenames = [os.path.basename(path) for path in json_paths]
 
     # Сохраняем список в JSON
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(filenames, f, ensure_ascii=False, indent=2)
+    with open(output_file, "wb") as f:
+        f.write(orjson.dumps(filenames, option=orjson.OPT_INDENT_2))
 
     print(f"Найдено {len(filenames)} файлов. Список сохранён в '{output_file}'.")
 